@@ -5,11 +5,12 @@ run basic_mondrian with given parameters
 # !/usr/bin/env python
 # coding=utf-8
 from mondrian import mondrian
+from experiment_grid import run_grid, write_grid_results
 from utils.read_adult_data import read_data as read_adult
 from utils.read_adult_data import read_tree as read_adult_tree
 from utils.read_informs_data import read_data as read_informs
 from utils.read_informs_data import read_tree as read_informs_tree
-import sys, copy, random
+import os, sys, random
 
 DATA_SELECT = 'a'
 DEFAULT_K = 10
@@ -26,9 +27,9 @@ def extend_result(val):
 
 
 # The input parameter result is the output of Mondrian
-# Write the anonymized result to anonymized.data
-def write_to_file(result):   
-    with open("data/anonymized.data", "w") as output:
+# Write the anonymized result to output_path, data/anonymized.data by default
+def write_to_file(result, output_path="data/anonymized.data"):   
+    with open(output_path, "w") as output:
         for r in result:
             # The map() function executes a specified function for each item in an iterable
             #   map(extend_result, r):                      for each item in r, if that item is a list, make a string out of it separated by commas
@@ -48,16 +49,14 @@ def get_result_one(att_trees, data, k=DEFAULT_K):
 
 # Run the algorithm with different k values (with QIDs and the size of the dataset fixed)
 def get_result_k(att_trees, data):
-    data_backup = copy.deepcopy(data)
     all_ncp = []
     all_rtime = []
     # for k in range(5, 105, 5):
     for k in [2, 5, 10, 25, 50, 100]:
         print('#' * 30)
-        print("K=" + k)
+        print("K=%d" % k)
         print("Mondrian")
         _, eval_result = mondrian(att_trees, data, k)
-        data = copy.deepcopy(data_backup)
         print("NCP %0.2f" % eval_result[0] + "%")
         all_ncp.append(round(eval_result[0], 2))
         print("Running time %0.2f" % eval_result[1] + " seconds")
@@ -69,14 +68,13 @@ def get_result_k(att_trees, data):
 # Run the algorithm on dataset chunks of increasing size (with k and QIDs fixed)
 # For each chunk, carry out the anonymization n times and average the results for the NPC metric
 def get_result_dataset(att_trees, data, k=DEFAULT_K, n=10):
-    data_backup = copy.deepcopy(data)
-    length = len(data_backup)
+    length = len(data)
     print("K=%d" % k)
     # The step by which to increase the size of the dataset in each iteration
     joint = 5000
     datasets = []
     # Check how many times the dataset can be increased
-    check_time = length / joint
+    check_time = length // joint
     if length % joint == 0:
         check_time -= 1
     # Store the chunks of dataset sizes to use
@@ -96,7 +94,6 @@ def get_result_dataset(att_trees, data, k=DEFAULT_K, n=10):
             result, eval_result = mondrian(att_trees, temp, k)
             ncp += eval_result[0]
             rtime += eval_result[1]
-            data = copy.deepcopy(data_backup)
         ncp /= n
         rtime /= n
         print("Average NCP %0.2f" % ncp + "%")
@@ -111,7 +108,6 @@ def get_result_dataset(att_trees, data, k=DEFAULT_K, n=10):
 # Run mondrian with setting the number of desired QIDs to use in each run (with k and the size of the dataset fixed)
 # Iterate from using 1 QID to using all of them
 def get_result_qi(att_trees, data, k=DEFAULT_K):    
-    data_backup = copy.deepcopy(data)
     ## The number of attributes in one line
     ls = len(data[0])
     all_ncp = []
@@ -120,7 +116,6 @@ def get_result_qi(att_trees, data, k=DEFAULT_K):
         print('#' * 30)
         print("Number of QI=%d" % i)
         _, eval_result = mondrian(att_trees, data, k, i)
-        data = copy.deepcopy(data_backup)
         print("NCP %0.2f" % eval_result[0] + "%")
         all_ncp.append(round(eval_result[0], 2))
         print("Running time %0.2f" % eval_result[1] + "seconds")
@@ -129,6 +124,16 @@ def get_result_qi(att_trees, data, k=DEFAULT_K):
     print("All Running time", all_rtime)
 
 
+# Run the whole (k, QIDs, size of the dataset, repetition) experiment matrix on a process pool
+# The results are written to output_path, data/grid_result.csv by default
+def get_result_grid(att_trees, data, n=10, output_path='data/grid_result.csv'):
+    joint = 5000
+    sizes = list(range(joint, len(data), joint)) + [len(data)]
+    rows = run_grid(att_trees, data, [2, 5, 10, 25, 50, 100], list(range(1, len(data[0]))), sizes, n)
+    write_grid_results(rows, output_path)
+    print("Grid of %d runs written to %s" % (len(rows), os.path.abspath(output_path)))
+
+
 if __name__ == '__main__':
     FLAG = ''
     LEN_ARGV = len(sys.argv)
@@ -156,6 +161,11 @@ if __name__ == '__main__':
         get_result_qi(ATT_TREES, RAW_DATA)
     elif FLAG == 'data':
         get_result_dataset(ATT_TREES, RAW_DATA)
+    elif FLAG == 'grid':
+        if LEN_ARGV > 3:
+            get_result_grid(ATT_TREES, RAW_DATA, output_path=sys.argv[3])
+        else:
+            get_result_grid(ATT_TREES, RAW_DATA)
     elif FLAG == 'one':
         if LEN_ARGV > 3:
             k = int(sys.argv[3])
@@ -165,9 +175,9 @@ if __name__ == '__main__':
     elif FLAG == '':
         get_result_one(ATT_TREES, RAW_DATA)
     else:
-        print("Usage: python anonymizer.py [a | i] [k | qi | data | one]")
+        print("Usage: python anonymizer.py [a | i] [k | qi | data | grid [output_file] | one [k]]")
         print("a: adult dataset, 'i': INFORMS ataset")
         print("K: varying k, qi: varying qi numbers, data: varying size of dataset, \
-                one: run only once")
+                grid: all combinations of k, qi numbers and size of dataset in parallel, one: run only once")
     # anonymized dataset is stored in result
     print("Finish Basic_Mondrian!!")
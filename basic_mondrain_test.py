@@ -1,10 +1,18 @@
 import unittest
 
-from mondrian import mondrian
+import mondrian as mondrian_module
+from mondrian import mondrian, get_binning_loss_bound, get_frequency_set, get_median_of_frequency_set, get_split_model
+from models.split_model import SplitModel
+from utils.split_tracer import SplitTracer
 # from utils.read_data import read_data, read_tree
 from models.gentree import GenTree
 from models.numrange import NumRange
+from models.partition import Partition
+from fixtures import DUPLICATE_DATA, SMALL_DATA, get_small_trees
+import os
 import random
+import threading
+import tempfile
 import pdb
 
 # Build a GenTree object
@@ -64,5 +72,94 @@ class functionTest(unittest.TestCase):
         # print eval_r
         self.assertTrue(abs(eval_r[0] - 100.0 / 8) < 0.05)
 
+    def test3_frequency_sets(self):
+        init()
+        data = [['6', '1', 'haha'],
+                ['6', '1', 'test'],
+                ['8', '2', 'haha'],
+                ['4', '3', 'hha']]
+        mondrian(ATT_TREE, data, 2)
+        partition = Partition(data, [10, (0, 9)], ['*', '1,10'], 2)
+        self.assertEqual(get_frequency_set(partition, 0), {'6': 2, '8': 1, '4': 1})
+        self.assertEqual(list(partition.frequency_sets.keys()), [0])
+        # After a failed attempt, all the attributes still allowed are counted in the same scan
+        partition.attribute_split_allowed_list[0] = 0
+        self.assertEqual(get_frequency_set(partition, 1), {'1': 2, '2': 1, '3': 1})
+        # The closed partitions do not keep their frequency sets
+        self.assertTrue(all(len(ec.frequency_sets) == 0 for ec in mondrian_module.RESULT))
+        # No third scan
+        partition.members = []
+        partition.attribute_split_allowed_list = [1, 1]
+        self.assertEqual(get_frequency_set(partition, 1), {'1': 2, '2': 1, '3': 1})
+        self.assertEqual(get_frequency_set(partition, 0), {'6': 2, '8': 1, '4': 1})
+        # The median of a frequency set counted elsewhere, e.g. by a GROUP BY query
+        self.assertEqual(get_median_of_frequency_set({'1': 2, '2': 1, '3': 1}, 1), ('1', '2', '1', '3'))
+
+    def test4_split_model(self):
+        init()
+        data = SMALL_DATA
+        result, eval_r = mondrian(ATT_TREE, data, 2)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'model.json')
+            get_split_model().save(path)
+            model = SplitModel.load(path, ATT_TREE)
+        ec_ids, generalizations = model.assign(data + [['8', '2', 'new'], ['11', '1', 'new']])
+        self.assertEqual(sorted(result), sorted(generalizations[i] + [data[i][-1]] for i in range(len(data))))
+        self.assertEqual(ec_ids[0], ec_ids[1])
+        self.assertEqual(generalizations[8], generalizations[2])
+        self.assertEqual(ec_ids[9], -1)
+        self.assertIsNone(generalizations[9])
+
+    def test5_tracer(self):
+        init()
+        data = SMALL_DATA
+        tracer = SplitTracer()
+        mondrian(ATT_TREE, data, 2, tracer=tracer)
+        events = tracer.to_dict()['traceEvents']
+        visits = [event for event in events if event['name'] == 'partition']
+        # The first span is the root partition, which covers all the others
+        self.assertEqual(visits[0]['args']['size'], 8)
+        self.assertEqual(visits[0]['args']['outcome'], 'split')
+        self.assertTrue(all(event['ts'] + event['dur'] <= visits[0]['ts'] + visits[0]['dur'] + 1 for event in events))
+        closed = [event for event in visits if event['args']['outcome'] == 'closed']
+        self.assertEqual(sum(event['args']['size'] for event in closed), 8)
+        self.assertTrue(any(event['name'] == 'get_median' for event in events))
+
+    def test6_dedup(self):
+        init()
+        data = DUPLICATE_DATA
+        result, eval_r = mondrian(ATT_TREE, data, 2)
+        dedup_result, dedup_eval_r = mondrian(ATT_TREE, data, 2, dedup=True)
+        self.assertEqual(sorted(result), sorted(dedup_result))
+        self.assertAlmostEqual(eval_r[0], dedup_eval_r[0])
+
+    def test7_bins(self):
+        global ATT_TREE
+        ATT_TREE = get_small_trees(5, 'width')
+        self.assertEqual(ATT_TREE[1].bins, [('1', '2'), ('3', '4'), ('5', '6'), ('7', '8'), ('9', '10')])
+        data = SMALL_DATA
+        result, eval_r = mondrian(ATT_TREE, data, 2)
+        # The generalized ranges start and end at the bounds of the bins
+        self.assertEqual(sorted(set(r[1] for r in result)), ['1,2', '3,4'])
+        self.assertAlmostEqual(get_binning_loss_bound(ATT_TREE), 100.0 / 9)
+
+    def test8_cancel(self):
+        init()
+        data = SMALL_DATA
+        result, eval_r = mondrian(ATT_TREE, data, 2)
+        self.assertFalse(mondrian_module.STOPPED)
+        cancel_event = threading.Event()
+        cancel_event.set()
+        reports = []
+        stopped_result, stopped_eval_r = mondrian(ATT_TREE, data, 2, cancel_event=cancel_event, progress=reports.append)
+        # Only the root was split, its sub-partitions are closed as they are
+        self.assertTrue(mondrian_module.STOPPED)
+        self.assertEqual(len(mondrian_module.RESULT), 2)
+        self.assertEqual(len(stopped_result), len(data))
+        self.assertTrue(stopped_eval_r[0] > eval_r[0])
+        self.assertEqual(reports[-1]['records_finalized'], len(data))
+        self.assertEqual(reports[-1]['partitions_pending'], 0)
+        self.assertTrue(reports[-1]['stopped'])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,172 @@
+"""
+anonymize many input files with basic_mondrian, overlapping reading, anonymization and writing
+"""
+
+# !/usr/bin/env python
+# coding=utf-8
+import queue
+import sys
+import threading
+import time
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Dict, List
+
+from anonymizer import DEFAULT_K, write_to_file
+from models.gentree import GenTree
+from models.numrange import NumRange
+from mondrian import mondrian
+from utils.read_adult_data import IS_CAT, get_num_range
+from utils.read_adult_data import read_data as read_adult
+from utils.read_adult_data import read_tree as read_adult_tree
+
+# The hierarchies of the categorical QIDs, set once in each worker process by init_worker
+WORKER_ATT_TREES: List[Dict[str, GenTree] | NumRange | None] = []
+
+
+def init_worker(att_trees: List[Dict[str, GenTree] | NumRange | None]):
+    """ Store the categorical hierarchies in the worker process, so they are not sent with every file """
+
+    global WORKER_ATT_TREES
+    WORKER_ATT_TREES = att_trees
+
+
+def anonymize_data(data: list[list[str]], k: int, is_cat: list[bool]):
+    """ Run Mondrian on the records of one file, the NumRange of the numeric QIDs is built from the file itself """
+
+    att_trees = []
+    for i, tree in enumerate(WORKER_ATT_TREES):
+        if is_cat[i]:
+            att_trees.append(tree)
+        else:
+            att_trees.append(get_num_range(data, i))
+    return mondrian(att_trees, data, k)
+
+
+def default_output_path(input_path: str) -> str:
+    """ Return the path the anonymized version of input_path is written to, if no output path is given """
+
+    return input_path + '.anonymized'
+
+
+def run_batch(input_paths: list[str], output_paths: list[str] | None = None, k=DEFAULT_K,
+              read_data: Callable[[str], list[list[str]]] = lambda path: read_adult(path, False),
+              att_trees: List[Dict[str, GenTree] | NumRange] | None = None, is_cat: list[bool] = IS_CAT,
+              read_threads=2, write_threads=2, processes: int | None = None, max_files_in_flight=4) -> list[dict]:
+    """
+    Anonymize several files in a pipeline: reader threads parse the files, a process pool runs Mondrian,
+    and writer threads write the results, so the three stages of different files overlap.
+
+        Parameters
+        ----------
+        output_paths : list[str]
+            The output path of each input file, defaults to default_output_path(input path)
+        read_data : callable
+            Reads the records of one file, it must not write any shared files
+        att_trees : list
+            The hierarchies of the QIDs, only the categorical ones are used, defaults to read_tree()
+        max_files_in_flight : int
+            The maximum number of files being read, anonymized or written at the same time.
+            A reader waits before opening a new file until one is written, which keeps the memory bounded.
+
+    Returns
+    -------
+    list[dict]
+        one row per input file (in the order of input_paths) with the keys
+        input, output, records, ncp, rtime and error (None once the anonymized file is written,
+        'not processed' if the pipeline stopped before reaching the file)
+    """
+
+    if output_paths is None:
+        output_paths = [default_output_path(path) for path in input_paths]
+    if att_trees is None:
+        att_trees = read_adult_tree()
+    # The numeric hierarchies are built from each file, do not read or send the ones of the default dataset:
+    # only the categorical hierarchies are indexed, so read_tree() does not read the numeric static files
+    categorical_trees = [att_trees[i] if is_cat[i] else None for i in range(len(is_cat))]
+
+    # A file is only reported without error once its output is written
+    reports = [{'input': path, 'output': output_paths[i], 'records': 0, 'ncp': 0.0, 'rtime': 0.0, 'error': 'not processed'}
+               for i, path in enumerate(input_paths)]
+    pending_files: queue.Queue[int] = queue.Queue()
+    for i in range(len(input_paths)):
+        pending_files.put(i)
+    anonymized_files: queue.Queue[tuple[int, Future] | None] = queue.Queue()
+    files_in_flight = threading.BoundedSemaphore(max_files_in_flight)
+
+    with ProcessPoolExecutor(processes, initializer=init_worker, initargs=(categorical_trees,)) as executor:
+
+        def read_files():
+            while True:
+                try:
+                    i = pending_files.get_nowait()
+                except queue.Empty:
+                    return
+                files_in_flight.acquire()
+                try:
+                    data = read_data(input_paths[i])
+                    reports[i]['records'] = len(data)
+                    future = executor.submit(anonymize_data, data, k, is_cat)
+                except BrokenProcessPool as e:
+                    # A worker process died, no file can be anonymized any more, the others stay 'not processed'
+                    reports[i]['error'] = repr(e)
+                    files_in_flight.release()
+                    return
+                except Exception as e:
+                    reports[i]['error'] = repr(e)
+                    files_in_flight.release()
+                    continue
+                future.add_done_callback(lambda f, i=i: anonymized_files.put((i, f)))
+
+        def write_files():
+            while True:
+                item = anonymized_files.get()
+                if item is None:
+                    return
+                i, future = item
+                try:
+                    result, (ncp, rtime) = future.result()
+                    write_to_file(result, output_paths[i])
+                    reports[i]['ncp'] = ncp
+                    reports[i]['rtime'] = rtime
+                    reports[i]['error'] = None
+                except Exception as e:
+                    reports[i]['error'] = repr(e)
+                finally:
+                    files_in_flight.release()
+
+        readers = [threading.Thread(target=read_files) for _ in range(read_threads)]
+        writers = [threading.Thread(target=write_files) for _ in range(write_threads)]
+        for thread in readers + writers:
+            thread.start()
+        for thread in readers:
+            thread.join()
+        # Wait for the running anonymizations, their callbacks hand the results to the writers
+        executor.shutdown(wait=True)
+        for _ in writers:
+            anonymized_files.put(None)
+        for thread in writers:
+            thread.join()
+
+    return reports
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python batch_pipeline.py [k] input_file [input_file ...]")
+        print("The anonymized version of each file is written next to it, with the .anonymized suffix")
+        sys.exit(1)
+    try:
+        K = int(sys.argv[1])
+        INPUT_PATHS = sys.argv[2:]
+    except ValueError:
+        K = DEFAULT_K
+        INPUT_PATHS = sys.argv[1:]
+    start_time = time.time()
+    for report in run_batch(INPUT_PATHS, k=K):
+        if report['error'] is None:
+            print("%s: %d records, NCP %0.2f%%" % (report['output'], report['records'], report['ncp']))
+        else:
+            print("%s: failed with %s" % (report['input'], report['error']))
+    print("Total time %0.2f seconds" % (time.time() - start_time))
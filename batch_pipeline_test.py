@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import batch_pipeline
+from batch_pipeline import anonymize_data, run_batch
+from models.lazy_trees import LazyTrees
+from mondrian import mondrian
+from utils.read_adult_data import IS_CAT, get_num_range, read_data, read_tree_file, ATT_NAMES, QI_INDEX
+
+CRASHING_RECORDS = 100
+
+
+def crash_on_file(data, k, is_cat):
+    # Kills the worker process on the file with more than CRASHING_RECORDS records
+    if len(data) > CRASHING_RECORDS:
+        os._exit(1)
+    return anonymize_data(data, k, is_cat)
+
+
+class batchPipelineTest(unittest.TestCase):
+    def test_batch(self):
+        def numeric_tree():
+            raise AssertionError("The numeric hierarchies are built from each file")
+        # Lazy like read_tree(), the numeric hierarchies must not be read
+        att_trees = LazyTrees([(lambda name=ATT_NAMES[index]: read_tree_file(name)) if IS_CAT[i] else numeric_tree
+                               for i, index in enumerate(QI_INDEX)])
+        with open('data/adult.data') as data_file:
+            lines = [next(data_file) for _ in range(600)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_paths = [os.path.join(tmp_dir, 'part%d.data' % i) for i in range(3)]
+            for i, path in enumerate(input_paths):
+                with open(path, 'w') as part:
+                    part.writelines(lines[i * 200:(i + 1) * 200])
+            output_paths = [path + '.out' for path in input_paths]
+            reports = run_batch(input_paths + [os.path.join(tmp_dir, 'missing.data')], output_paths + [''], 5,
+                                att_trees=att_trees, processes=2, max_files_in_flight=2)
+
+            self.assertIsNotNone(reports[-1]['error'])
+            for i, path in enumerate(input_paths):
+                self.assertIsNone(reports[i]['error'])
+                data = read_data(path, False)
+                trees = [att_trees[j] if IS_CAT[j] else get_num_range(data, j) for j in range(len(IS_CAT))]
+                result, (ncp, _) = mondrian(trees, data, 5)
+                self.assertAlmostEqual(reports[i]['ncp'], ncp)
+                with open(output_paths[i]) as output:
+                    self.assertEqual(len(output.readlines()), len(result))
+
+    def test_dead_worker(self):
+        with open('data/adult.data') as data_file:
+            lines = [next(data_file) for _ in range(400)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sizes = [2 * CRASHING_RECORDS, 50, 50, 50, 50]
+            input_paths = [os.path.join(tmp_dir, 'part%d.data' % i) for i in range(len(sizes))]
+            for i, path in enumerate(input_paths):
+                with open(path, 'w') as part:
+                    part.writelines(lines[sum(sizes[:i]):sum(sizes[:i + 1])])
+            output_paths = [path + '.out' for path in input_paths]
+            with mock.patch.object(batch_pipeline, 'anonymize_data', crash_on_file):
+                reports = run_batch(input_paths, output_paths, 5, processes=1, max_files_in_flight=1)
+
+            self.assertIsNotNone(reports[0]['error'])
+            for i, report in enumerate(reports):
+                # No file is reported as anonymized without its output
+                self.assertEqual(report['error'] is None, os.path.exists(output_paths[i]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,392 @@
+"""
+run basic_mondrian on bitmap indexes of the QIDs, a partition is a bitmap of its rows
+"""
+
+# !/usr/bin/env python
+# coding=utf-8
+import re
+import time
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Dict, List
+
+import mondrian as mondrian_module
+from models.gentree import GenTree
+from models.numrange import NumRange
+from models.partition import Partition
+from mondrian import check_splitable, choose_qid, get_normalized_width, init, init_qi_range
+
+# A row takes 1 bit in a bitmap and 32 bits in a row array: a partition with less than
+# (number of rows) / SPARSE_RATIO records is kept as a row array, which is smaller
+SPARSE_RATIO = 32
+# A numeric QID gets one prefix bitmap per value (or per bin), (number of rows) / 8 bytes each: above this number
+# of prefixes, its bitmap partitions are split with the column of ranks instead, like the row arrays
+MAX_PREFIX_BITMAPS = 256
+# The offsets of the set bits of each byte value
+BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+NON_ZERO_BYTE = re.compile(b'[^\x00]')
+
+
+class BitmapPartition(Partition):
+
+    """Class for a partition represented by its rows, as a bitmap while it is large, as a row array once it is small.
+    self.rows: the bitmap, bit i is set if the row i of the dataset belongs to the partition, None for a row array
+    self.row_array: the sorted array('I') of the rows of the partition, None for a bitmap
+    self.count: the number of records in the partition, the popcount of rows
+    self.sorted_ranks: the sorted ranks of the values of the numeric QIDs already looked at, for a row array,
+        or for a bitmap on a QID without prefix bitmaps
+    """
+
+    def __init__(self, rows: int | array, attribute_width_list, attribute_generalization_list, qi_len):
+        super().__init__([], attribute_width_list, attribute_generalization_list, qi_len)
+        if isinstance(rows, int):
+            self.rows = rows
+            self.row_array = None
+            self.count = rows.bit_count()
+        else:
+            self.rows = None
+            self.row_array = rows
+            self.count = len(rows)
+        self.sorted_ranks: Dict[int, array] = {}
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        """ Keep only the row array of a closed partition, so no bitmap of the size of the dataset is left per EC """
+
+        if self.rows is not None:
+            self.row_array = get_rows(self.rows)
+            self.rows = None
+        self.sorted_ranks = {}
+
+
+def get_rows(bitmap: int) -> array:
+    """ Return the indices of the set bits, in increasing order, as an array('I').
+    The bytes of the bitmap are scanned in C, only the non-zero ones are looked at in Python. """
+
+    rows = array('I')
+    bitmap_bytes = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+    for match in NON_ZERO_BYTE.finditer(bitmap_bytes):
+        start = match.start()
+        base = start << 3
+        rows.extend([base + bit for bit in BYTE_BITS[bitmap_bytes[start]]])
+    return rows
+
+
+class BitmapIndex(object):
+
+    """Class for the bitmap indexes of the QIDs of a dataset, built once at load time.
+    The bitmaps are Python ints (bit i for the row i), so intersections are & and counts are int.bit_count().
+    They are not compressed: a bitmap takes (number of rows) / 8 bytes, whatever the number of bits set.
+    The partitions with few rows do not use them, they are split with the columns of ranks and codes, see BitmapMondrian.
+    self.rows: the number of rows
+    self.value_bitmaps: for each categorical QID, the bitmap of each value
+    self.node_bitmaps: for each categorical QID, the bitmap of each hierarchy node, the union of the bitmaps of its leaves
+    self.prefix_bitmaps: for each numeric QID, the bitmap of the rows whose value has a rank <= r in NumRange.sort_value,
+        by r for each rank r, or only for the last rank of each bin if the values are binned (see NumRange.build_bins),
+        so a range of values is a single bitmap. The QIDs that would need more than MAX_PREFIX_BITMAPS have none.
+    self.rank_columns: for each numeric QID, the rank of the value of each row
+    self.code_columns: for each categorical QID, the index of the value of each row in self.values
+    self.values: for each categorical QID, its values, in the order of their first row
+    self.build_time: the seconds spent building the bitmaps
+    """
+
+    def __init__(self, att_trees: List[Dict[str, GenTree] | NumRange], data: list[list[str]], qi_num: int):
+        start_time = time.time()
+        self.rows = len(data)
+        self.value_bitmaps: Dict[int, Dict[str, int]] = {}
+        self.node_bitmaps: Dict[int, Dict[str, int]] = {}
+        self.prefix_bitmaps: Dict[int, List[int]] = {}
+        self.rank_columns: Dict[int, array] = {}
+        self.code_columns: Dict[int, array] = {}
+        self.values: Dict[int, List[str]] = {}
+
+        size = (len(data) + 7) // 8
+        for qid_index in range(qi_num):
+            tree = att_trees[qid_index]
+            if isinstance(tree, NumRange):
+                rank_column = array('I', [tree.dict[record[qid_index]] for record in data])
+                self.rank_columns[qid_index] = rank_column
+                if tree.bins is None:
+                    last_ranks = list(range(len(tree.sort_value)))
+                else:
+                    last_ranks = [tree.dict[high] for _, high in tree.bins]
+                if len(last_ranks) > MAX_PREFIX_BITMAPS:
+                    continue
+                # Set the bits of each value (or bin) in a byte array, no bitmap is built per value of a binned QID
+                group_bytes = [bytearray(size) for _ in last_ranks]
+                for row, rank in enumerate(rank_column):
+                    group_bytes[bisect_left(last_ranks, rank)][row >> 3] |= 1 << (row & 7)
+                prefix_bitmaps = {}
+                prefix = 0
+                for rank, bits in zip(last_ranks, group_bytes):
+                    prefix |= int.from_bytes(bits, 'little')
+                    prefix_bitmaps[rank] = prefix
+                self.prefix_bitmaps[qid_index] = prefix_bitmaps
+                continue
+
+            # Set the bits in byte arrays, and turn each one into an int once
+            value_bytes: Dict[str, bytearray] = {}
+            for row, record in enumerate(data):
+                try:
+                    value_bytes[record[qid_index]][row >> 3] |= 1 << (row & 7)
+                except KeyError:
+                    value_bytes[record[qid_index]] = bytearray(size)
+                    value_bytes[record[qid_index]][row >> 3] |= 1 << (row & 7)
+            value_bitmaps = {value: int.from_bytes(bits, 'little') for value, bits in value_bytes.items()}
+            self.value_bitmaps[qid_index] = value_bitmaps
+            node_bitmaps = {}
+            for node_value, node in tree.items():
+                bitmap = 0
+                for value in node.cover:
+                    bitmap |= value_bitmaps.get(value, 0)
+                node_bitmaps[node_value] = bitmap
+            self.node_bitmaps[qid_index] = node_bitmaps
+            self.values[qid_index] = list(value_bitmaps)
+            code_of_value = {value: code for code, value in enumerate(self.values[qid_index])}
+            self.code_columns[qid_index] = array('I', [code_of_value[record[qid_index]] for record in data])
+        self.build_time = time.time() - start_time
+
+
+class BitmapMondrian(object):
+
+    """Class for running Mondrian on a BitmapIndex: splits are intersections and histograms are popcounts,
+    there is no Python work per record while a partition is a bitmap. The small partitions are row arrays
+    (see SPARSE_RATIO), split with a Python loop over their rows, like mondrian does.
+    self.index: the BitmapIndex of the dataset
+    """
+
+    def __init__(self, index: BitmapIndex):
+        self.index = index
+
+    def new_partition(self, rows: int | array, attribute_width_list, attribute_generalization_list) -> BitmapPartition:
+        """ Create a sub-partition, a bitmap is turned into a row array if that is smaller """
+
+        if isinstance(rows, int) and rows.bit_count() * SPARSE_RATIO < self.index.rows:
+            rows = get_rows(rows)
+        return BitmapPartition(rows, attribute_width_list, attribute_generalization_list, mondrian_module.NUM_OF_QIDS_USED)
+
+    def count_at_most(self, partition: BitmapPartition, qid_index: int, rank: int) -> int:
+        """ Return the number of records of the partition whose value of a numeric QID has a rank <= rank,
+        the rank is the last one of a bin if the values are binned """
+
+        if partition.row_array is None and qid_index in self.index.prefix_bitmaps:
+            return (partition.rows & self.index.prefix_bitmaps[qid_index][rank]).bit_count()
+        try:
+            sorted_ranks = partition.sorted_ranks[qid_index]
+        except KeyError:
+            rank_column = self.index.rank_columns[qid_index]
+            rows = partition.row_array if partition.row_array is not None else get_rows(partition.rows)
+            sorted_ranks = partition.sorted_ranks[qid_index] = array('I', sorted(rank_column[row] for row in rows))
+        return bisect_right(sorted_ranks, rank)
+
+    def first_rank(self, partition: BitmapPartition, qid_index: int, low: int, high: int, count: int) -> int:
+        """ Binary search the smallest rank in [low, high] such that at least count records of the partition are <= it.
+        If the values are binned, the search is over the bins and the last rank of the bin is returned. """
+
+        numrange = mondrian_module.ATT_TREES[qid_index]
+        if numrange.bins is None:
+            while low < high:
+                middle = (low + high) // 2
+                if self.count_at_most(partition, qid_index, middle) >= count:
+                    high = middle
+                else:
+                    low = middle + 1
+            return low
+
+        bins = numrange.bins
+        low = numrange.bin_of_value[numrange.sort_value[low]]
+        high = numrange.bin_of_value[numrange.sort_value[high]]
+        while low < high:
+            middle = (low + high) // 2
+            if self.count_at_most(partition, qid_index, numrange.dict[bins[middle][1]]) >= count:
+                high = middle
+            else:
+                low = middle + 1
+        return numrange.dict[bins[low][1]]
+
+    def get_median(self, partition: BitmapPartition, qid_index: int) -> tuple[int, int, int, int]:
+        """ Find the ranks of the median, of the next value, and of the smallest and the largest values, see mondrian.get_median.
+        The median rank is -1 if the partition cannot be split. """
+
+        numrange = mondrian_module.ATT_TREES[qid_index]
+        low, high = partition.attribute_width_list[qid_index]
+        min_rank = self.first_rank(partition, qid_index, low, high, 1)
+        max_rank = self.first_rank(partition, qid_index, min_rank, high, partition.count)
+        # The values of the bins (see NumRange.build_bins) count as one value, from the start to the end of the bin
+        if numrange.bins is not None:
+            min_rank = numrange.dict[numrange.bins[numrange.bin_of_value[numrange.sort_value[min_rank]]][0]]
+            max_rank = numrange.dict[numrange.bins[numrange.bin_of_value[numrange.sort_value[max_rank]]][1]]
+            if numrange.bin_of_value[numrange.sort_value[min_rank]] == numrange.bin_of_value[numrange.sort_value[max_rank]]:
+                return -1, -1, min_rank, max_rank
+
+        middle_index_of_the_records = partition.count / 2
+        if middle_index_of_the_records < mondrian_module.GLOBAL_K or min_rank == max_rank:
+            return -1, -1, min_rank, max_rank
+
+        split_rank = self.first_rank(partition, qid_index, min_rank, max_rank, middle_index_of_the_records)
+        if numrange.bins is not None:
+            split_rank = numrange.dict[numrange.bins[numrange.bin_of_value[numrange.sort_value[split_rank]]][1]]
+        records_processed = self.count_at_most(partition, qid_index, split_rank)
+        if records_processed == partition.count:
+            return -1, -1, min_rank, max_rank
+        next_rank = self.first_rank(partition, qid_index, split_rank, max_rank, records_processed + 1)
+        if numrange.bins is not None:
+            next_rank = numrange.dict[numrange.bins[numrange.bin_of_value[numrange.sort_value[next_rank]]][0]]
+        return split_rank, next_rank, min_rank, max_rank
+
+    def split_numerical_attribute(self, partition: BitmapPartition, qid_index: int) -> list[BitmapPartition]:
+        """ Split the partition at the median of a numeric QID, see mondrian.split_numerical_attribute """
+
+        sort_value = mondrian_module.ATT_TREES[qid_index].sort_value
+        split_rank, next_rank, min_rank, max_rank = self.get_median(partition, qid_index)
+
+        if min_rank == max_rank:
+            partition.attribute_generalization_list[qid_index] = sort_value[min_rank]
+        else:
+            partition.attribute_generalization_list[qid_index] = sort_value[min_rank] + ',' + sort_value[max_rank]
+        partition.attribute_width_list[qid_index] = (min_rank, max_rank)
+
+        if split_rank == -1:
+            return []
+
+        if partition.row_array is None and qid_index in self.index.prefix_bitmaps:
+            l_rows = partition.rows & self.index.prefix_bitmaps[qid_index][split_rank]
+            r_rows = partition.rows ^ l_rows
+        elif partition.row_array is None:
+            rank_column = self.index.rank_columns[qid_index]
+            l_bytes = bytearray((self.index.rows + 7) // 8)
+            for row in get_rows(partition.rows):
+                if rank_column[row] <= split_rank:
+                    l_bytes[row >> 3] |= 1 << (row & 7)
+            l_rows = int.from_bytes(l_bytes, 'little')
+            r_rows = partition.rows ^ l_rows
+        else:
+            rank_column = self.index.rank_columns[qid_index]
+            l_rows = array('I')
+            r_rows = array('I')
+            for row in partition.row_array:
+                if rank_column[row] <= split_rank:
+                    l_rows.append(row)
+                else:
+                    r_rows.append(row)
+
+        l_attribute_width_list = partition.attribute_width_list[:]
+        r_attribute_width_list = partition.attribute_width_list[:]
+        l_attribute_width_list[qid_index] = (min_rank, split_rank)
+        r_attribute_width_list[qid_index] = (next_rank, max_rank)
+
+        l_attribute_generalization_list = partition.attribute_generalization_list[:]
+        r_attribute_generalization_list = partition.attribute_generalization_list[:]
+        l_attribute_generalization_list[qid_index], r_attribute_generalization_list[qid_index] = mondrian_module.split_numerical_value(
+            partition.attribute_generalization_list[qid_index], sort_value[split_rank])
+
+        return [self.new_partition(l_rows, l_attribute_width_list, l_attribute_generalization_list),
+                self.new_partition(r_rows, r_attribute_width_list, r_attribute_generalization_list)]
+
+    def split_categorical_attribute(self, partition: BitmapPartition, qid_index: int) -> list[BitmapPartition]:
+        """ Split the partition along the children of its hierarchy node, the child groups are intersections
+        with the bitmaps of the child nodes (or a loop over the rows of a row array), see mondrian.split_categorical_attribute """
+
+        node_to_split_at = mondrian_module.ATT_TREES[qid_index][partition.attribute_generalization_list[qid_index]]
+        child_nodes = node_to_split_at.children[:]
+        if len(child_nodes) == 0:
+            return []
+
+        if partition.row_array is None:
+            node_bitmaps = self.index.node_bitmaps[qid_index]
+            sub_groups = [partition.rows & node_bitmaps[node.value] for node in child_nodes]
+            sub_group_sizes = [sub_group.bit_count() for sub_group in sub_groups]
+        else:
+            # The child that covers each value, -1 for the values outside the node
+            child_of_code = [-1] * len(self.index.values[qid_index])
+            for i, value in enumerate(self.index.values[qid_index]):
+                for j, node in enumerate(child_nodes):
+                    if value in node.cover:
+                        child_of_code[i] = j
+                        break
+            code_column = self.index.code_columns[qid_index]
+            sub_groups = [array('I') for _ in child_nodes]
+            for row in partition.row_array:
+                sub_groups[child_of_code[code_column[row]]].append(row)
+            sub_group_sizes = [len(sub_group) for sub_group in sub_groups]
+        for sub_group_size in sub_group_sizes:
+            # If one child covers less than k elements, the split is invalid
+            if 0 < sub_group_size < mondrian_module.GLOBAL_K:
+                return []
+
+        sub_partitions = []
+        for i, sub_group in enumerate(sub_groups):
+            if sub_group_sizes[i] == 0:
+                continue
+            new_attribute_width_list = partition.attribute_width_list[:]
+            new_attribute_generalization_list = partition.attribute_generalization_list[:]
+            new_attribute_width_list[qid_index] = len(child_nodes[i])
+            new_attribute_generalization_list[qid_index] = child_nodes[i].value
+            sub_partitions.append(self.new_partition(sub_group, new_attribute_width_list, new_attribute_generalization_list))
+        return sub_partitions
+
+    def anonymize(self, whole_partition: BitmapPartition) -> list[BitmapPartition]:
+        """ Split the partitions depth-first, in the same order as mondrian.anonymize, and return the closed ones """
+
+        result = []
+        frontier = [whole_partition]
+        while frontier:
+            partition = frontier.pop()
+            while check_splitable(partition):
+                qid_index = choose_qid(partition)
+                if mondrian_module.IS_QID_CATEGORICAL[qid_index] is False:
+                    sub_partitions = self.split_numerical_attribute(partition, qid_index)
+                else:
+                    sub_partitions = self.split_categorical_attribute(partition, qid_index)
+                if len(sub_partitions) == 0:
+                    partition.attribute_split_allowed_list[qid_index] = 0
+                    continue
+                frontier.extend(reversed(sub_partitions))
+                break
+            else:
+                partition.close()
+                result.append(partition)
+        return result
+
+
+def mondrian_bitmap(att_trees: List[Dict[str, GenTree] | NumRange], data: list[list[str]], k: int, QI_num=-1,
+                    index: BitmapIndex | None = None):
+    """
+    basic Mondrian for k-anonymity on bitmap indexes, with the same partitions, result and NCP as mondrian.
+    The index can be built once with BitmapIndex and reused by several runs on the same data,
+    the running time does not include building it.
+
+    Returns
+    -------
+    (list, (float, float))
+        like mondrian
+    """
+
+    init(att_trees, data, k, QI_num)
+    qi_num = mondrian_module.NUM_OF_QIDS_USED
+    if index is None:
+        index = BitmapIndex(att_trees, data, qi_num)
+    attribute_width_list, attribute_generalization_list = init_qi_range()
+
+    start_time = time.time()
+    bitmap_mondrian = BitmapMondrian(index)
+    whole_partition = bitmap_mondrian.new_partition((1 << len(data)) - 1, attribute_width_list, attribute_generalization_list)
+    partitions = bitmap_mondrian.anonymize(whole_partition)
+    rtime = float(time.time() - start_time)
+
+    result = []
+    ncp = 0.0
+    for partition in partitions:
+        r_ncp = 0.0
+        for i in range(qi_num):
+            r_ncp += get_normalized_width(partition, i)
+        for row in partition.row_array:
+            result.append(partition.attribute_generalization_list + [data[row][-1]])
+        ncp += r_ncp * len(partition)
+    ncp /= qi_num
+    ncp /= len(data)
+    ncp *= 100
+    return result, (ncp, rtime)
@@ -0,0 +1,72 @@
+import unittest
+from unittest import mock
+
+import bitmap_index
+import mondrian as mondrian_module
+from bitmap_index import SPARSE_RATIO, BitmapIndex, BitmapMondrian, get_rows, mondrian_bitmap
+from fixtures import read_adult_sample
+from mondrian import mondrian
+
+
+class bitmapIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.data, self.att_trees = read_adult_sample()
+
+    def test_get_rows(self):
+        for rows in [[], [0], [3, 7, 8, 63, 64, 1000], list(range(0, 3000, 7))]:
+            bitmap = 0
+            for row in rows:
+                bitmap |= 1 << row
+            self.assertEqual(list(get_rows(bitmap)), rows)
+
+    def test_index(self):
+        index = BitmapIndex(self.att_trees, self.data, 8)
+        # sex is the categorical QID with index 6
+        self.assertEqual(list(get_rows(index.value_bitmaps[6]['Male'])), [i for i, record in enumerate(self.data) if record[6] == 'Male'])
+        self.assertEqual(index.node_bitmaps[6]['*'], (1 << len(self.data)) - 1)
+        self.assertEqual([index.values[6][code] for code in index.code_columns[6]], [record[6] for record in self.data])
+        # age is the numeric QID with index 0, the last prefix bitmap holds all the rows
+        self.assertEqual(index.prefix_bitmaps[0][len(self.att_trees[0].sort_value) - 1].bit_count(), len(self.data))
+        self.assertEqual(list(index.rank_columns[0]), [self.att_trees[0].dict[record[0]] for record in self.data])
+
+    def test_same_as_mondrian(self):
+        _, binned_trees = read_adult_sample(max_bins=8)
+        for att_trees in [self.att_trees, binned_trees]:
+            for k in [5, 20, 200]:
+                result, (ncp, _) = mondrian(att_trees, self.data, k)
+                bitmap_result, (bitmap_ncp, _) = mondrian_bitmap(att_trees, self.data, k)
+                self.assertEqual(bitmap_result, result)
+                self.assertEqual(bitmap_ncp, ncp)
+
+    def test_prefix_bitmaps(self):
+        _, binned_trees = read_adult_sample(max_bins=8)
+        index = BitmapIndex(binned_trees, self.data, 8)
+        # One prefix bitmap per bin, ending at the last value of the bin
+        self.assertEqual(sorted(index.prefix_bitmaps[0]), [binned_trees[0].dict[high] for _, high in binned_trees[0].bins])
+        for rank, prefix in index.prefix_bitmaps[0].items():
+            self.assertEqual(prefix.bit_count(), sum(1 for r in index.rank_columns[0] if r <= rank))
+
+        # The QIDs with too many values have no prefix bitmaps, their bitmap partitions are split with the column of ranks
+        with mock.patch.object(bitmap_index, 'MAX_PREFIX_BITMAPS', 8):
+            index = BitmapIndex(self.att_trees, self.data, 8)
+        self.assertNotIn(0, index.prefix_bitmaps)
+        self.assertEqual(list(index.rank_columns[0]), [self.att_trees[0].dict[record[0]] for record in self.data])
+        for k in [5, 200]:
+            result, (ncp, _) = mondrian(self.att_trees, self.data, k)
+            bitmap_result, (bitmap_ncp, _) = mondrian_bitmap(self.att_trees, self.data, k, index=index)
+            self.assertEqual(bitmap_result, result)
+            self.assertEqual(bitmap_ncp, ncp)
+
+    def test_closed_partitions(self):
+        mondrian_module.init(self.att_trees, self.data, 5)
+        width_list, generalization_list = mondrian_module.init_qi_range()
+        bitmap_mondrian = BitmapMondrian(BitmapIndex(self.att_trees, self.data, 8))
+        partitions = bitmap_mondrian.anonymize(bitmap_mondrian.new_partition((1 << len(self.data)) - 1, width_list, generalization_list))
+        # No closed partition keeps a bitmap of the size of the dataset
+        self.assertTrue(all(partition.rows is None and len(partition.row_array) == partition.count for partition in partitions))
+        self.assertEqual(sum(partition.count for partition in partitions), len(self.data))
+        self.assertTrue(max(partition.count for partition in partitions) * SPARSE_RATIO < len(self.data))
+
+
+if __name__ == '__main__':
+    unittest.main()
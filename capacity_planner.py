@@ -0,0 +1,366 @@
+"""
+predict the running time and the memory of basic_mondrian jobs from calibration runs
+"""
+
+# !/usr/bin/env python
+# coding=utf-8
+import json
+import math
+import multiprocessing
+import random
+import sys
+import time
+import tracemalloc
+
+from typing import Dict, List
+
+import mondrian as mondrian_module
+from models.gentree import GenTree
+from models.numrange import NumRange
+from mondrian import mondrian
+from utils.split_tracer import SplitTracer
+
+RUNTIME_FEATURES = ['records_x_depth', 'classes_x_attempts', 'constant']
+MEMORY_FEATURES = ['records', 'classes_x_qids', 'constant']
+# The phases the running time is split into, see PhaseTimer
+PHASES = ['median', 'split', 'other']
+
+
+class PhaseTimer(SplitTracer):
+
+    """Tracer that only adds up the durations of the split routines, so it takes constant memory.
+    self.totals: the seconds spent in get_median, split_numerical_attribute and split_categorical_attribute
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.totals = {'get_median': 0.0, 'split_numerical_attribute': 0.0, 'split_categorical_attribute': 0.0}
+
+    def complete(self, name: str, start: float, args: dict | None = None):
+        # The spans of the partitions cover their whole subtree, they are not a phase
+        if name in self.totals:
+            self.totals[name] += time.perf_counter() - start
+
+    def phases(self, rtime: float) -> Dict[str, float]:
+        """ Split the running time of a run into PHASES: finding the medians, distributing the records, and the rest """
+
+        median = self.totals['get_median']
+        # get_median is called inside split_numerical_attribute
+        split = self.totals['split_numerical_attribute'] + self.totals['split_categorical_attribute'] - median
+        return {'median': median, 'split': split, 'other': max(rtime - median - split, 0.0)}
+
+
+class DatasetSummary(object):
+
+    """Class for the summary of a dataset, which is all the planner needs to know about it.
+    self.rows: the number of records
+    self.cardinalities: for each QID used, the number of distinct values (numeric) or leaves (categorical)
+    self.fanouts: for each QID used, the average number of children of the inner hierarchy nodes, 2 for numeric QIDs
+    self.bytes_per_row: the memory of one parsed record
+    """
+
+    def __init__(self, rows: int, cardinalities: list[int], fanouts: list[float], bytes_per_row: float):
+        self.rows = rows
+        self.cardinalities = list(cardinalities)
+        self.fanouts = list(fanouts)
+        self.bytes_per_row = bytes_per_row
+
+    def max_depth(self) -> float:
+        """ The depth of the partition tree the hierarchies allow, whatever k and the number of records are """
+
+        depth = 0.0
+        for cardinality, fanout in zip(self.cardinalities, self.fanouts):
+            depth += math.log(max(cardinality, 1), max(fanout, 2))
+        return depth
+
+    def features(self, k: int, classes: float | None = None, depth: float | None = None) -> Dict[str, float]:
+        """
+        Return the variables of the cost model for a run with the given k.
+        classes and depth are the number of equivalence classes and the average depth of a record in the partition tree,
+        measured by measure_run or predicted by CostModel.predict. They default to rows / k and its log2.
+        """
+
+        qi_num = len(self.cardinalities)
+        if classes is None:
+            classes = max(self.rows / k, 1.0)
+        if depth is None:
+            depth = min(math.log2(max(classes, 2.0)), self.max_depth())
+        return {'records_x_depth': self.rows * depth,
+                # Near the leaves every QID is attempted before a partition is closed
+                'classes_x_attempts': classes * (qi_num + sum(self.fanouts) / max(qi_num, 1)),
+                'records': float(self.rows),
+                'classes_x_qids': classes * qi_num,
+                'constant': 1.0}
+
+
+def summarize(att_trees: List[Dict[str, GenTree] | NumRange], data: list[list[str]], QI_num=-1) -> DatasetSummary:
+    """ Summarize a dataset from its hierarchies, the cardinality of the numeric QIDs comes from NumRange.support """
+
+    if QI_num <= 0:
+        QI_num = len(data[0]) - 1
+    cardinalities = []
+    fanouts = []
+    for tree in att_trees[:QI_num]:
+        if isinstance(tree, NumRange):
+            cardinalities.append(len(tree.support) if len(tree.support) > 0 else len(tree.sort_value))
+            fanouts.append(2.0)
+        else:
+            inner_nodes = [node for node in tree.values() if len(node.children) > 0]
+            cardinalities.append(len(tree['*']))
+            fanouts.append(sum(len(node.children) for node in inner_nodes) / max(len(inner_nodes), 1))
+
+    sample = data[:1000]
+    bytes_per_row = 0.0
+    for record in sample:
+        bytes_per_row += sys.getsizeof(record) + sum(sys.getsizeof(value) for value in record)
+    bytes_per_row /= max(len(sample), 1)
+    return DatasetSummary(len(data), cardinalities, fanouts, bytes_per_row)
+
+
+def solve_least_squares(rows: list[list[float]], targets: list[float]) -> list[float]:
+    """ Fit the coefficients of a linear model with the normal equations (with a tiny ridge, so they are always solvable) """
+
+    size = len(rows[0])
+    # Scale the columns, the features differ by orders of magnitude
+    scales = [max(abs(row[j]) for row in rows) or 1.0 for j in range(size)]
+    scaled = [[row[j] / scales[j] for j in range(size)] for row in rows]
+
+    matrix = [[sum(row[i] * row[j] for row in scaled) for j in range(size)] for i in range(size)]
+    vector = [sum(row[i] * target for row, target in zip(scaled, targets)) for i in range(size)]
+    for i in range(size):
+        matrix[i][i] += 1e-9
+
+    # Gaussian elimination with partial pivoting
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda r: abs(matrix[r][col]))
+        matrix[col], matrix[pivot] = matrix[pivot], matrix[col]
+        vector[col], vector[pivot] = vector[pivot], vector[col]
+        for r in range(col + 1, size):
+            factor = matrix[r][col] / matrix[col][col]
+            for c in range(col, size):
+                matrix[r][c] -= factor * matrix[col][c]
+            vector[r] -= factor * vector[col]
+    coefficients = [0.0] * size
+    for r in range(size - 1, -1, -1):
+        coefficients[r] = (vector[r] - sum(matrix[r][c] * coefficients[c] for c in range(r + 1, size))) / matrix[r][r]
+    return [coefficient / scale for coefficient, scale in zip(coefficients, scales)]
+
+
+class CostModel(object):
+
+    """Class for the cost model of Mondrian, fitted from calibration runs.
+    self.runtime_coefficients: the coefficients of RUNTIME_FEATURES, in seconds
+    self.memory_coefficients: the coefficients of MEMORY_FEATURES, in bytes of peak memory of mondrian (without the dataset)
+    self.classes_ratio: the number of equivalence classes found, relative to rows / k
+    self.depth_ratio: the average depth of a record in the partition tree, relative to log2 of the number of classes
+    self.phase_shares: the share of the running time spent in each of PHASES
+    self.runs: the measurements the model was fitted on
+    """
+
+    def __init__(self, runtime_coefficients: list[float], memory_coefficients: list[float], runs: list[dict] | None = None,
+                 classes_ratio=1.0, depth_ratio=1.0, phase_shares: Dict[str, float] | None = None):
+        self.runtime_coefficients = list(runtime_coefficients)
+        self.memory_coefficients = list(memory_coefficients)
+        self.runs = runs or []
+        self.classes_ratio = classes_ratio
+        self.depth_ratio = depth_ratio
+        self.phase_shares = phase_shares or {phase: 0.0 for phase in PHASES}
+
+    @staticmethod
+    def fit(runs: list[dict]) -> 'CostModel':
+        """ Fit the model on measurements of measure_run: the features of each run are computed from the classes and
+        the depth it found, and the predictions of predict use the average ratios of those to their estimates """
+
+        runtime_coefficients = solve_least_squares([[run[f] for f in RUNTIME_FEATURES] for run in runs], [run['rtime'] for run in runs])
+        memory_coefficients = solve_least_squares([[run[f] for f in MEMORY_FEATURES] for run in runs], [run['peak_memory'] for run in runs])
+        classes_ratio = sum(run['classes_found'] / max(run['rows'] / run['k'], 1.0) for run in runs) / len(runs)
+        depth_ratio = sum(run['depth'] / math.log2(max(run['classes_found'], 2)) for run in runs) / len(runs)
+        phase_shares = {phase: sum(run['phases'][phase] / max(run['rtime'], 1e-9) for run in runs) / len(runs) for phase in PHASES}
+        return CostModel(runtime_coefficients, memory_coefficients, runs, classes_ratio, depth_ratio, phase_shares)
+
+    def predict(self, summary: DatasetSummary, k: int) -> Dict[str, float]:
+        """
+        Predict a run of Mondrian on a dataset.
+
+        Returns
+        -------
+        dict
+            rtime: the running time of mondrian in seconds
+            peak_memory: the peak memory of mondrian, without the dataset, in bytes
+            data_memory: the memory of the parsed dataset, in bytes
+            classes: the expected number of equivalence classes
+            depth: the expected average depth of a record in the partition tree
+            phases: the expected seconds spent in each of PHASES
+        """
+
+        classes = max(self.classes_ratio * summary.rows / k, 1.0)
+        depth = min(self.depth_ratio * math.log2(max(classes, 2.0)), summary.max_depth())
+        features = summary.features(k, classes, depth)
+        rtime = max(sum(c * features[f] for c, f in zip(self.runtime_coefficients, RUNTIME_FEATURES)), 0.0)
+        peak_memory = sum(c * features[f] for c, f in zip(self.memory_coefficients, MEMORY_FEATURES))
+        return {'rtime': rtime, 'peak_memory': max(peak_memory, 0.0), 'data_memory': summary.rows * summary.bytes_per_row,
+                'classes': classes, 'depth': depth, 'phases': {phase: rtime * self.phase_shares[phase] for phase in PHASES}}
+
+    def save(self, path: str):
+        """ Write the model to a JSON file """
+
+        with open(path, "w") as output:
+            json.dump({'runtime': self.runtime_coefficients, 'memory': self.memory_coefficients, 'runs': self.runs,
+                       'classes_ratio': self.classes_ratio, 'depth_ratio': self.depth_ratio, 'phase_shares': self.phase_shares},
+                      output, indent=2)
+
+    @staticmethod
+    def load(path: str) -> 'CostModel':
+        """ Read a model written by save """
+
+        with open(path) as model_file:
+            model_dict = json.load(model_file)
+        return CostModel(model_dict['runtime'], model_dict['memory'], model_dict['runs'], model_dict.get('classes_ratio', 1.0),
+                         model_dict.get('depth_ratio', 1.0), model_dict.get('phase_shares'))
+
+
+def read_memory_status(field: str) -> float | None:
+    """ Return a memory field of /proc/self/status (e.g. VmRSS or VmHWM) in bytes, None if it cannot be read """
+
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith(field + ':'):
+                    return float(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_memory() -> bool:
+    """ Reset the peak resident memory of the process (VmHWM), return False if the platform does not allow it """
+
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        return False
+    return read_memory_status('VmHWM') is not None
+
+
+def get_record_depth() -> float:
+    """ Return the average depth of a record in the partition tree of the last run of mondrian """
+
+    total_depth = 0
+    stack = [(mondrian_module.SPLIT_ROOT, 0)]
+    while stack:
+        node, depth = stack.pop()
+        if node.ec_id != -1:
+            total_depth += len(mondrian_module.RESULT[node.ec_id]) * depth
+        stack.extend((child, depth + 1) for child in node.children)
+    return total_depth / max(sum(len(partition) for partition in mondrian_module.RESULT), 1)
+
+
+def measure_in_process(att_trees: List[Dict[str, GenTree] | NumRange], data: list[list[str]], k: int, QI_num=-1) -> dict:
+    """
+    Run Mondrian once in this process and return the features of the run, computed from the classes and the depth it found,
+    with the measured running time, the seconds of each of PHASES, the peak memory and the partition statistics.
+    The peak memory is the growth of the peak resident memory, which costs nothing. Where it cannot be reset (not Linux),
+    tracemalloc is used instead, which slows Mondrian down: the run is then marked with memory_traced.
+    """
+
+    summary = summarize(att_trees, data, QI_num)
+    timer = PhaseTimer()
+    memory_traced = not reset_peak_memory()
+    if memory_traced:
+        tracemalloc.start()
+    else:
+        rss_before = read_memory_status('VmRSS')
+    try:
+        _, (ncp, rtime) = mondrian(att_trees, data, k, QI_num, tracer=timer)
+        if memory_traced:
+            _, peak_memory = tracemalloc.get_traced_memory()
+        else:
+            peak_memory = max(read_memory_status('VmHWM') - rss_before, 0.0)
+    finally:
+        if memory_traced:
+            tracemalloc.stop()
+
+    classes_found = len(mondrian_module.RESULT)
+    depth = get_record_depth()
+    run = summary.features(k, float(classes_found), depth)
+    run.update({'rows': len(data), 'k': k, 'qi_num': len(summary.cardinalities), 'rtime': rtime, 'phases': timer.phases(rtime),
+                'peak_memory': float(peak_memory), 'memory_traced': memory_traced, 'ncp': ncp,
+                'classes_found': classes_found, 'depth': depth})
+    return run
+
+
+def measure_run(att_trees: List[Dict[str, GenTree] | NumRange], data: list[list[str]], k: int, QI_num=-1) -> dict:
+    """
+    Measure a run of Mondrian (see measure_in_process) in a new process: the memory freed by the earlier runs
+    of this process would be reused, and the growth of the resident memory would miss it.
+    """
+
+    if QI_num <= 0:
+        QI_num = len(data[0]) - 1
+    # Only the hierarchies of the QIDs used are sent
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return pool.apply(measure_in_process, (list(att_trees[:QI_num]), data, k, QI_num))
+
+
+def calibrate(att_trees: List[Dict[str, GenTree] | NumRange], data: list[list[str]], sizes: list[int] | None = None,
+              k_values: list[int] | None = None, qi_values: list[int] | None = None, seed=0) -> CostModel:
+    """ Run Mondrian on samples of the dataset and fit a cost model on the measurements """
+
+    if sizes is None:
+        sizes = [len(data) // 16, len(data) // 8, len(data) // 4]
+    if k_values is None:
+        k_values = [5, 20, 100]
+    if qi_values is None:
+        qi_values = [-1]
+
+    runs = []
+    for size in sizes:
+        sample = random.Random("%d-%d" % (seed, size)).sample(data, min(size, len(data)))
+        for k in k_values:
+            for qi_num in qi_values:
+                runs.append(measure_run(att_trees, sample, k, qi_num))
+    return CostModel.fit(runs)
+
+
+def recommend(prediction: Dict[str, float], memory_budget: float, serial_time_budget: float) -> str:
+    """
+    Recommend how to execute a job.
+
+        Parameters
+        ----------
+        memory_budget : float
+            The memory available to the job, in bytes
+        serial_time_budget : float
+            The longest acceptable running time of a single process, in seconds
+
+    Returns
+    -------
+    str
+        'out-of-core' if the dataset and Mondrian do not fit into the memory budget,
+        'parallel' if they fit, but one process would take too long,
+        'serial' otherwise
+    """
+
+    if prediction['data_memory'] + prediction['peak_memory'] > memory_budget:
+        return 'out-of-core'
+    if prediction['rtime'] > serial_time_budget:
+        return 'parallel'
+    return 'serial'
+
+
+if __name__ == '__main__':
+    from utils.read_adult_data import read_data, read_tree
+
+    RAW_DATA = read_data()
+    ATT_TREES = read_tree()
+    MODEL = calibrate(ATT_TREES, RAW_DATA)
+    SUMMARY = summarize(ATT_TREES, RAW_DATA)
+    for K in [2, 10, 50]:
+        for ROWS in [len(RAW_DATA), 10 * len(RAW_DATA), 1000 * len(RAW_DATA)]:
+            SUMMARY.rows = ROWS
+            PREDICTION = MODEL.predict(SUMMARY, K)
+            print("K=%d, %d records: %0.2f seconds (%s), %d classes of depth %0.1f, %0.1f MB peak + %0.1f MB data, %s" % (
+                K, ROWS, PREDICTION['rtime'], ', '.join('%s %0.2f' % item for item in PREDICTION['phases'].items()),
+                PREDICTION['classes'], PREDICTION['depth'], PREDICTION['peak_memory'] / 2 ** 20,
+                PREDICTION['data_memory'] / 2 ** 20, recommend(PREDICTION, 8 * 2 ** 30, 3600)))
@@ -0,0 +1,58 @@
+import unittest
+
+from unittest import mock
+
+import capacity_planner
+import mondrian as mondrian_module
+from capacity_planner import PHASES, calibrate, measure_in_process, measure_run, recommend, solve_least_squares, summarize
+from fixtures import read_adult_sample
+
+
+class capacityPlannerTest(unittest.TestCase):
+    def test_least_squares(self):
+        rows = [[x, x * x, 1.0] for x in [1.0, 2.0, 5.0, 10.0, 100.0]]
+        targets = [3 * a + 0.5 * b + 7 for a, b, _ in rows]
+        for coefficient, expected in zip(solve_least_squares(rows, targets), [3, 0.5, 7]):
+            self.assertAlmostEqual(coefficient, expected, places=4)
+
+    def test_recommend(self):
+        prediction = {'rtime': 100.0, 'peak_memory': 2e9, 'data_memory': 1e9}
+        self.assertEqual(recommend(prediction, 2e9, 1000), 'out-of-core')
+        self.assertEqual(recommend(prediction, 4e9, 10), 'parallel')
+        self.assertEqual(recommend(prediction, 4e9, 1000), 'serial')
+
+    def test_measure_run(self):
+        data, att_trees = read_adult_sample(2000)
+        # Everything is measured from a single run
+        with mock.patch.object(capacity_planner, 'mondrian', wraps=capacity_planner.mondrian) as mondrian:
+            run = measure_in_process(att_trees, data, 10)
+        self.assertEqual(mondrian.call_count, 1)
+        self.assertEqual(run['classes_found'], len(mondrian_module.RESULT))
+        # The same run in a new process
+        spawned_run = measure_run(att_trees, data, 10)
+        self.assertEqual(spawned_run['classes_found'], run['classes_found'])
+        self.assertEqual(spawned_run['depth'], run['depth'])
+        self.assertTrue(spawned_run['peak_memory'] > 0)
+        self.assertEqual(run['classes_x_qids'], run['classes_found'] * 8)
+        self.assertTrue(1 < run['depth'] < len(data))
+        self.assertAlmostEqual(run['records_x_depth'], run['depth'] * len(data))
+        self.assertEqual(sorted(run['phases']), sorted(PHASES))
+        self.assertTrue(run['phases']['median'] > 0 and run['phases']['split'] > 0)
+        self.assertAlmostEqual(sum(run['phases'].values()), run['rtime'], delta=run['rtime'] * 0.05)
+
+    def test_calibrate(self):
+        data, att_trees = read_adult_sample(4000)
+        model = calibrate(att_trees, data, [500, 1000, 2000], [5, 25])
+        self.assertEqual(len(model.runs), 6)
+        summary = summarize(att_trees, data)
+        small = model.predict(summary, 10)
+        summary.rows *= 10
+        large = model.predict(summary, 10)
+        self.assertTrue(large['rtime'] > small['rtime'] > 0)
+        self.assertTrue(large['data_memory'] > small['data_memory'] > 0)
+        self.assertTrue(large['classes'] > small['classes'] > 0)
+        self.assertAlmostEqual(sum(large['phases'].values()), large['rtime'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+
+import mondrian as mondrian_module
+from mondrian import mondrian
+from fixtures import read_adult_sample
+
+
+class Interrupted(Exception):
+    pass
+
+
+class checkpointTest(unittest.TestCase):
+    def test_resume(self):
+        data, att_trees = read_adult_sample()
+        expected, (expected_ncp, _) = mondrian(att_trees, data, 5)
+
+        split_partition = mondrian_module.split_partition
+        calls = [0]
+
+        def interrupted_split_partition(partition, qid_index):
+            calls[0] += 1
+            if calls[0] == 500:
+                raise Interrupted()
+            return split_partition(partition, qid_index)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'run.checkpoint')
+            mondrian_module.split_partition = interrupted_split_partition
+            try:
+                with self.assertRaises(Interrupted):
+                    mondrian(att_trees, data, 5, checkpoint_path=path, checkpoint_interval=0)
+            finally:
+                mondrian_module.split_partition = split_partition
+            self.assertTrue(os.path.exists(path))
+            self.assertFalse(os.path.exists(path + '.tmp'))
+
+            # A different k does not match the checkpoint
+            with self.assertRaises(ValueError):
+                mondrian(att_trees, data, 6, checkpoint_path=path, resume=True)
+
+            result, (ncp, _) = mondrian(att_trees, data, 5, checkpoint_path=path, resume=True)
+            self.assertEqual(result, expected)
+            self.assertEqual(ncp, expected_ncp)
+            self.assertFalse(os.path.exists(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
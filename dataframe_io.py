@@ -0,0 +1,275 @@
+"""
+run basic_mondrian on an Apache Arrow table or a pandas DataFrame, column by column
+"""
+
+# !/usr/bin/env python
+# coding=utf-8
+import time
+
+from typing import Dict, List
+
+import mondrian as mondrian_module
+from models.gentree import GenTree
+from models.numrange import NumRange
+from models.partition import Partition
+from mondrian import check_splitable, choose_qid, get_median_of_frequency_set, get_normalized_width, init, init_qi_range
+
+EC_COLUMN = 'ec_id'
+
+
+def import_arrow():
+    """ Import pyarrow and numpy, which are only needed by this module """
+
+    try:
+        import numpy
+        import pyarrow
+    except ImportError:
+        raise ImportError("dataframe_io needs pyarrow (and numpy): pip install pyarrow")
+    return numpy, pyarrow
+
+
+class ColumnarPartition(Partition):
+
+    """Class for a partition of a columnar table.
+    self.rows: numpy array of the indices of the rows in the partition, it replaces the members list
+    """
+
+    def __init__(self, rows, attribute_width_list, attribute_generalization_list, qi_len):
+        super().__init__([], attribute_width_list, attribute_generalization_list, qi_len)
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class ColumnarMondrian(object):
+
+    """Class for running Mondrian on dictionary encoded columns, with numpy operations instead of per-record Python work.
+    self.codes: for each QID, the numpy array of the dictionary index of the value of each row
+    self.values: for each QID, the dictionary, i.e. the distinct values as strings
+    self.code_of_value: for each QID, the dictionary index of each value
+    self.numbers: for each numeric QID, the numpy array of the integer value of each dictionary entry
+    """
+
+    def __init__(self, codes: list, values: list[list[str]]):
+        numpy, _ = import_arrow()
+        self.codes = codes
+        self.values = values
+        self.code_of_value = [{value: code for code, value in enumerate(column_values)} for column_values in values]
+        self.numbers = {}
+        for i in range(mondrian_module.NUM_OF_QIDS_USED):
+            if mondrian_module.IS_QID_CATEGORICAL[i] is False:
+                self.numbers[i] = numpy.array([int(value) for value in values[i]], dtype=numpy.int64)
+
+    def get_frequency_set(self, partition: ColumnarPartition, qid_index: int) -> dict[str, int]:
+        """ Count the values of a QID in the partition with a bincount of its codes, and cache it in the partition """
+
+        numpy, _ = import_arrow()
+        try:
+            return partition.frequency_sets[qid_index]
+        except KeyError:
+            pass
+        values = self.values[qid_index]
+        counts = numpy.bincount(self.codes[qid_index][partition.rows], minlength=len(values))
+        frequency_set = {values[code]: int(counts[code]) for code in numpy.flatnonzero(counts)}
+        partition.frequency_sets[qid_index] = frequency_set
+        return frequency_set
+
+    def split_numerical_attribute(self, partition: ColumnarPartition, qid_index: int) -> list[ColumnarPartition]:
+        """ Split the partition at the median of a numeric QID, see mondrian.split_numerical_attribute """
+
+        frequency_set = self.get_frequency_set(partition, qid_index)
+        numrange = mondrian_module.ATT_TREES[qid_index]
+        (unique_value_to_split_at, next_unique_value, min_unique_value, max_unique_value) = get_median_of_frequency_set(frequency_set, qid_index)
+
+        if min_unique_value == max_unique_value:
+            partition.attribute_generalization_list[qid_index] = min_unique_value
+        else:
+            partition.attribute_generalization_list[qid_index] = min_unique_value + ',' + max_unique_value
+        partition.attribute_width_list[qid_index] = (numrange.dict[min_unique_value], numrange.dict[max_unique_value])
+
+        if unique_value_to_split_at == '' or unique_value_to_split_at == next_unique_value:
+            return []
+
+        in_left = self.numbers[qid_index][self.codes[qid_index][partition.rows]] <= int(unique_value_to_split_at)
+
+        l_attribute_width_list = partition.attribute_width_list[:]
+        r_attribute_width_list = partition.attribute_width_list[:]
+        l_attribute_width_list[qid_index] = (partition.attribute_width_list[qid_index][0], numrange.dict[unique_value_to_split_at])
+        r_attribute_width_list[qid_index] = (numrange.dict[next_unique_value], partition.attribute_width_list[qid_index][1])
+
+        l_attribute_generalization_list = partition.attribute_generalization_list[:]
+        r_attribute_generalization_list = partition.attribute_generalization_list[:]
+        l_attribute_generalization_list[qid_index], r_attribute_generalization_list[qid_index] = mondrian_module.split_numerical_value(
+            partition.attribute_generalization_list[qid_index], unique_value_to_split_at)
+
+        qi_len = mondrian_module.NUM_OF_QIDS_USED
+        return [ColumnarPartition(partition.rows[in_left], l_attribute_width_list, l_attribute_generalization_list, qi_len),
+                ColumnarPartition(partition.rows[~in_left], r_attribute_width_list, r_attribute_generalization_list, qi_len)]
+
+    def split_categorical_attribute(self, partition: ColumnarPartition, qid_index: int) -> list[ColumnarPartition]:
+        """ Split the partition along the children of its hierarchy node, see mondrian.split_categorical_attribute """
+
+        numpy, _ = import_arrow()
+        node_to_split_at = mondrian_module.ATT_TREES[qid_index][partition.attribute_generalization_list[qid_index]]
+        child_nodes = node_to_split_at.children[:]
+        if len(child_nodes) == 0:
+            return []
+
+        values = self.values[qid_index]
+        # The index of the child that covers each dictionary entry, -1 for the entries not in the partition
+        child_of_code = numpy.full(len(values), -1, dtype=numpy.int64)
+        sub_group_sizes = [0] * len(child_nodes)
+        for qid_value, count in self.get_frequency_set(partition, qid_index).items():
+            for i, node in enumerate(child_nodes):
+                if qid_value in node.cover:
+                    sub_group_sizes[i] += count
+                    break
+            else:
+                print("Generalization hierarchy error!")
+                continue
+            child_of_code[self.code_of_value[qid_index][qid_value]] = i
+
+        for sub_group_size in sub_group_sizes:
+            # If one child covers less than k elements, the split is invalid
+            if 0 < sub_group_size < mondrian_module.GLOBAL_K:
+                return []
+
+        children = child_of_code[self.codes[qid_index][partition.rows]]
+        sub_partitions = []
+        for i, sub_group_size in enumerate(sub_group_sizes):
+            if sub_group_size == 0:
+                continue
+            new_attribute_width_list = partition.attribute_width_list[:]
+            new_attribute_generalization_list = partition.attribute_generalization_list[:]
+            new_attribute_width_list[qid_index] = len(child_nodes[i])
+            new_attribute_generalization_list[qid_index] = child_nodes[i].value
+            sub_partitions.append(ColumnarPartition(partition.rows[children == i], new_attribute_width_list,
+                                                    new_attribute_generalization_list, mondrian_module.NUM_OF_QIDS_USED))
+        return sub_partitions
+
+    def anonymize(self, whole_partition: ColumnarPartition) -> list[ColumnarPartition]:
+        """ Split the partitions depth-first, in the same order as mondrian.anonymize, and return the closed ones """
+
+        result = []
+        frontier = [whole_partition]
+        while frontier:
+            partition = frontier.pop()
+            while check_splitable(partition):
+                qid_index = choose_qid(partition)
+                if mondrian_module.IS_QID_CATEGORICAL[qid_index] is False:
+                    sub_partitions = self.split_numerical_attribute(partition, qid_index)
+                else:
+                    sub_partitions = self.split_categorical_attribute(partition, qid_index)
+                if len(sub_partitions) == 0:
+                    partition.attribute_split_allowed_list[qid_index] = 0
+                    continue
+                frontier.extend(reversed(sub_partitions))
+                break
+            else:
+                # The frequency sets are not needed any more, do not keep them alive in the result
+                partition.frequency_sets = {}
+                result.append(partition)
+        return result
+
+
+def encode_column(column):
+    """ Return the dictionary indices (as a numpy array) and the dictionary (as strings) of an Arrow column """
+
+    _, pyarrow = import_arrow()
+    column = column.combine_chunks() if isinstance(column, pyarrow.ChunkedArray) else column
+    if column.null_count > 0:
+        raise ValueError("QID columns cannot contain nulls")
+    if not pyarrow.types.is_dictionary(column.type):
+        column = column.dictionary_encode()
+    return column.indices.to_numpy(), [str(value) for value in column.dictionary.to_pylist()]
+
+
+def get_num_range(codes, values: list[str]) -> NumRange:
+    """ Build the NumRange of a numeric QID from its dictionary encoded column """
+
+    numpy, _ = import_arrow()
+    counts = numpy.bincount(codes, minlength=len(values))
+    support = {value: int(counts[code]) for code, value in enumerate(values) if counts[code] > 0}
+    sort_value = sorted(support.keys(), key=lambda x: int(x))
+    return NumRange(sort_value, support)
+
+
+def mondrian_arrow(table, qi_columns: list[str], att_trees: List[Dict[str, GenTree] | NumRange | None], k: int,
+                   sa_columns: list[str] | None = None):
+    """
+    basic Mondrian for k-anonymity on a pyarrow Table.
+    The QID columns are dictionary encoded, and Mondrian runs on numpy arrays of their codes and of row indices,
+    without building a Python object per record.
+
+        Parameters
+        ----------
+        qi_columns : list[str]
+            The QID columns, in the order of att_trees
+        att_trees : list
+            For each QID, its generalization hierarchy (categorical), its NumRange (numeric),
+            or None for a numeric QID whose NumRange is built from the column
+        sa_columns : list[str]
+            The columns passed through unchanged, defaults to all the columns that are not QIDs
+
+    Returns
+    -------
+    (pyarrow.Table, (float, float))
+        the QID columns as dictionary encoded generalized values, the SA columns, and the ec_id column
+        the NCP percentage and the running time, like mondrian
+    """
+
+    numpy, pyarrow = import_arrow()
+    if sa_columns is None:
+        sa_columns = [name for name in table.column_names if name not in qi_columns]
+
+    start_time = time.time()
+    codes = []
+    values = []
+    trees = []
+    for i, name in enumerate(qi_columns):
+        column_codes, column_values = encode_column(table.column(name))
+        codes.append(column_codes)
+        values.append(column_values)
+        trees.append(att_trees[i] if att_trees[i] is not None else get_num_range(column_codes, column_values))
+
+    init(trees, [qi_columns], k, len(qi_columns))
+    attribute_width_list, attribute_generalization_list = init_qi_range()
+    backend = ColumnarMondrian(codes, values)
+    whole_partition = ColumnarPartition(numpy.arange(table.num_rows), attribute_width_list, attribute_generalization_list, len(qi_columns))
+    result = backend.anonymize(whole_partition)
+
+    ec_ids = numpy.empty(table.num_rows, dtype=numpy.int32)
+    for ec_id, partition in enumerate(result):
+        ec_ids[partition.rows] = ec_id
+
+    arrays = []
+    for i in range(len(qi_columns)):
+        # The distinct generalized values of the QID, and the one of each EC
+        generalizations: dict[str, int] = {}
+        generalization_of_ec = numpy.array([generalizations.setdefault(partition.attribute_generalization_list[i], len(generalizations))
+                                            for partition in result], dtype=numpy.int32)
+        arrays.append(pyarrow.DictionaryArray.from_arrays(generalization_of_ec[ec_ids], pyarrow.array(list(generalizations.keys()))))
+    arrays.extend(table.column(name) for name in sa_columns)
+    arrays.append(pyarrow.array(ec_ids))
+    rtime = float(time.time() - start_time)
+
+    ncp = 0.0
+    for partition in result:
+        r_ncp = 0.0
+        for i in range(len(qi_columns)):
+            r_ncp += get_normalized_width(partition, i)
+        ncp += r_ncp * len(partition)
+    ncp /= len(qi_columns)
+    ncp /= table.num_rows
+    ncp *= 100
+    return pyarrow.table(arrays, names=qi_columns + sa_columns + [EC_COLUMN]), (ncp, rtime)
+
+
+def mondrian_dataframe(df, qi_columns: list[str], att_trees: List[Dict[str, GenTree] | NumRange | None], k: int,
+                       sa_columns: list[str] | None = None):
+    """ basic Mondrian for k-anonymity on a pandas DataFrame, see mondrian_arrow. The generalized QIDs are categorical columns. """
+
+    _, pyarrow = import_arrow()
+    table, eval_result = mondrian_arrow(pyarrow.Table.from_pandas(df, preserve_index=False), qi_columns, att_trees, k, sa_columns)
+    return table.to_pandas(), eval_result
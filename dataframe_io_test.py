@@ -0,0 +1,50 @@
+import unittest
+
+import mondrian as mondrian_module
+
+from mondrian import mondrian
+from fixtures import read_adult_sample
+from utils.read_adult_data import ATT_NAMES, IS_CAT, QI_INDEX
+
+try:
+    import pyarrow
+    import pandas
+    from dataframe_io import mondrian_arrow, mondrian_dataframe
+except ImportError:
+    pyarrow = None
+
+
+@unittest.skipIf(pyarrow is None, "pyarrow and pandas are not installed")
+class dataframeIOTest(unittest.TestCase):
+    def setUp(self):
+        self.data, self.att_trees = read_adult_sample()
+        self.qi_columns = [ATT_NAMES[index] for index in QI_INDEX]
+        columns = {}
+        for i, name in enumerate(self.qi_columns):
+            columns[name] = [record[i] if IS_CAT[i] else int(record[i]) for record in self.data]
+        columns['class'] = [record[-1] for record in self.data]
+        self.df = pandas.DataFrame(columns)
+        # The NumRanges of the numeric QIDs are built from the columns
+        self.trees = [tree if IS_CAT[i] else None for i, tree in enumerate(self.att_trees)]
+
+    def test_arrow(self):
+        result, (ncp, _) = mondrian(self.att_trees, self.data, 10)
+        table, (arrow_ncp, _) = mondrian_arrow(pyarrow.Table.from_pandas(self.df), self.qi_columns, self.trees, 10)
+        self.assertAlmostEqual(ncp, arrow_ncp)
+        self.assertEqual(table.column_names, self.qi_columns + ['class', 'ec_id'])
+        self.assertTrue(pyarrow.types.is_dictionary(table.schema.field('age').type))
+        rows = [list(row) for row in zip(*[table.column(name).to_pylist() for name in self.qi_columns + ['class']])]
+        self.assertEqual(sorted(rows), sorted(result))
+
+    def test_dataframe(self):
+        mondrian(self.att_trees, self.data, 10)
+        sizes = sorted(len(partition) for partition in mondrian_module.RESULT)
+        df, (ncp, _) = mondrian_dataframe(self.df, self.qi_columns, self.trees, 10, ['class'])
+        self.assertEqual(len(df), len(self.df))
+        self.assertEqual(list(df['class']), list(self.df['class']))
+        self.assertEqual(str(df['age'].dtype), 'category')
+        self.assertEqual(sorted(df.groupby('ec_id').size()), sizes)
+
+
+if __name__ == '__main__':
+    unittest.main()
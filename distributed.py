@@ -0,0 +1,381 @@
+"""
+run basic_mondrian on several worker processes, which may be on other machines, over TCP
+"""
+
+# !/usr/bin/env python
+# coding=utf-8
+import multiprocessing
+import os
+import pickle
+import queue
+import sys
+import threading
+import time
+
+from array import array
+from multiprocessing.connection import Client, Listener
+from typing import List
+
+import mondrian as mondrian_module
+from models.gentree import GenTree
+from models.numrange import NumRange
+from models.partition import Partition
+from mondrian import anonymize, close_partition, get_normalized_width, init, init_qi_range, visit
+
+# The messages are pickled tuples, on connections authenticated with a shared key (see get_authkey):
+# both ends prove they hold the key before any message is unpickled
+# The environment variable that holds the key of the workers and the coordinators on different machines
+AUTHKEY_VARIABLE = 'MONDRIAN_AUTHKEY'
+# The metrics of the sub-partitions of the last run, see mondrian_distributed
+TASK_METRICS: List[dict] = []
+
+
+def get_authkey() -> bytes:
+    """ Return the key of the connections: the value of AUTHKEY_VARIABLE, or else the key of this process,
+    which the worker processes started by start_local_workers inherit """
+
+    if os.environ.get(AUTHKEY_VARIABLE):
+        return os.environ[AUTHKEY_VARIABLE].encode()
+    return bytes(multiprocessing.current_process().authkey)
+
+
+def encode_task(partition: Partition, qi_num: int) -> tuple:
+    """
+    Encode a pending partition for a worker: its QID values, one column per QID, and its state.
+    A column is dictionary encoded: (the distinct values, the array('I') of the index of each record's value as bytes),
+    so each distinct value is sent once, and the SA is not sent at all.
+    """
+
+    columns = []
+    for qid_index in range(qi_num):
+        codes: dict[str, int] = {}
+        column = array('I', [codes.setdefault(record[qid_index], len(codes)) for record in partition.members])
+        columns.append((list(codes), column.tobytes()))
+    return (columns, partition.attribute_width_list, partition.attribute_generalization_list,
+            partition.attribute_split_allowed_list)
+
+
+def decode_records(columns: list[tuple[list[str], bytes]]) -> list[tuple[str, ...]]:
+    """ Rebuild the records of a task from its columns (see encode_task), the records hold only the QID values """
+
+    values_of_columns = []
+    for values, column_bytes in columns:
+        column = array('I')
+        column.frombytes(column_bytes)
+        values_of_columns.append([values[code] for code in column])
+    return list(zip(*values_of_columns))
+
+
+def run_task(att_trees: List[GenTree | NumRange], k: int, qi_num: int, task: tuple) -> tuple:
+    """
+    Anonymize a sub-partition in the worker, in the same depth-first order as a single run.
+
+    Returns
+    -------
+    (SplitNode, list, dict)
+        the node of the sub-partition, the root of its partition tree
+        the closed partitions, each one as (member indices in the task, width list, generalization list, node)
+        the metrics of the task
+    """
+
+    columns, attribute_width_list, attribute_generalization_list, attribute_split_allowed_list = task
+    start_time = time.time()
+    records = decode_records(columns)
+    init(att_trees, records, k, qi_num)
+    init_qi_range()
+    partition = Partition(records, attribute_width_list, attribute_generalization_list, qi_num)
+    partition.attribute_split_allowed_list = list(attribute_split_allowed_list)
+    anonymize(partition)
+
+    record_index = {id(record): i for i, record in enumerate(records)}
+    closed = []
+    for ec in mondrian_module.RESULT:
+        members = array('I', [record_index[id(record)] for record in ec.members])
+        closed.append((members.tobytes(), ec.attribute_width_list, ec.attribute_generalization_list, ec.node))
+    return partition.node, closed, {'records': len(records), 'partitions': len(closed), 'rtime': time.time() - start_time}
+
+
+def serve_worker(host='127.0.0.1', port=0, port_queue=None, authkey: bytes | None = None):
+    """
+    Serve coordinators one connection at a time, forever.
+    A connection starts with ('init', att_trees, k, qi_num), followed by ('task', task_id, task) messages,
+    each one answered by ('result', task_id, result) (see run_task) or ('error', task_id, message).
+    The connections that do not prove they hold authkey (get_authkey() by default) are closed before any message is read.
+    If port is 0, a free port is used, and it is put into port_queue.
+    """
+
+    if authkey is None:
+        authkey = get_authkey()
+    listener = Listener((host, port), authkey=authkey)
+    if port_queue is not None:
+        port_queue.put(listener.address[1])
+    while True:
+        try:
+            conn = listener.accept()
+        except (OSError, EOFError, multiprocessing.AuthenticationError):
+            continue
+        with conn:
+            try:
+                session = None
+                while True:
+                    message = conn.recv()
+                    if message[0] == 'init':
+                        session = message[1:]
+                    elif message[0] == 'task':
+                        try:
+                            conn.send(('result', message[1], run_task(*session, message[2])))
+                        except Exception as error:
+                            conn.send(('error', message[1], repr(error)))
+                    else:
+                        break
+            except (OSError, EOFError):
+                pass
+
+
+def start_local_workers(count: int, host='127.0.0.1') -> tuple[list, list[tuple[str, int]]]:
+    """ Start count worker processes on this machine, return the processes and their addresses.
+    The workers inherit the key of this process (see get_authkey). """
+
+    port_queue = multiprocessing.Queue()
+    processes = []
+    for _ in range(count):
+        process = multiprocessing.Process(target=serve_worker, args=(host, 0, port_queue), daemon=True)
+        process.start()
+        processes.append(process)
+    return processes, [(host, port_queue.get()) for _ in range(count)]
+
+
+def split_top(partition: Partition, split_depth: int) -> tuple[list, list[Partition]]:
+    """
+    Split the partition in the coordinator down to split_depth.
+
+    Returns
+    -------
+    (list, list[Partition])
+        the slots, in the depth-first order of a single run: a closed partition, or the index of a task
+        the pending partitions at split_depth, which are the tasks of the workers
+    """
+
+    slots = []
+    tasks = []
+    mondrian_module.FRONTIER.append((partition, 0))
+    while mondrian_module.FRONTIER:
+        partition, depth = mondrian_module.FRONTIER.pop()
+        if depth >= split_depth:
+            slots.append(len(tasks))
+            tasks.append(partition)
+            continue
+        closed = len(mondrian_module.RESULT)
+        visit(partition, depth)
+        if len(mondrian_module.RESULT) > closed:
+            slots.append(mondrian_module.RESULT[-1])
+    return slots, tasks
+
+
+def run_tasks(tasks: list[Partition], workers: list[tuple[str, int]], init_frame: bytes, qi_num: int, timeout: float | None,
+              max_attempts: int, authkey: bytes) -> list[tuple]:
+    """
+    Send the tasks to the workers, one thread per worker, and return the result of each task.
+    A task whose worker fails (connection lost, timeout or error) is queued again for the other workers,
+    a worker whose connection is lost gets no more tasks.
+    A worker that times out stays in the pool: it gets its next task once it answers, and its late result is used
+    if the task is not done yet. It is only given up on after max_attempts times the timeout without an answer.
+    """
+
+    pending = queue.Queue()
+    for task_id in range(len(tasks)):
+        pending.put(task_id)
+    results: list[tuple | None] = [None] * len(tasks)
+    attempts = [0] * len(tasks)
+    errors = []
+    lock = threading.Lock()
+
+    def finished():
+        with lock:
+            return len(errors) > 0 or all(result is not None for result in results)
+
+    def retry(task_id: int, error: str):
+        with lock:
+            attempts[task_id] += 1
+            if attempts[task_id] >= max_attempts:
+                errors.append("sub-partition %d failed %d times, last error: %s" % (task_id, attempts[task_id], error))
+            elif results[task_id] is None:
+                pending.put(task_id)
+
+    def drive(address: tuple[str, int]):
+        try:
+            conn = Client(address, authkey=authkey)
+        except (OSError, EOFError, multiprocessing.AuthenticationError):
+            return
+        with conn:
+            try:
+                conn.send_bytes(init_frame)
+            except OSError:
+                return
+            # The task sent and not answered yet, and whether it timed out (its attempt is already counted)
+            task_id = None
+            timed_out = False
+            while not finished():
+                try:
+                    if task_id is None:
+                        try:
+                            task_id = pending.get(timeout=0.1)
+                        except queue.Empty:
+                            continue
+                        with lock:
+                            # The late result of a timed out attempt may have come in the meantime
+                            if results[task_id] is not None:
+                                task_id = None
+                                continue
+                        conn.send(('task', task_id, encode_task(tasks[task_id], qi_num)))
+                        start_time = time.time()
+                        timed_out = False
+                    if not conn.poll(0.1):
+                        elapsed = time.time() - start_time
+                        if timeout is not None and not timed_out and elapsed > timeout:
+                            timed_out = True
+                            retry(task_id, "no answer after %0.1f seconds" % timeout)
+                        elif timeout is not None and elapsed > max_attempts * timeout:
+                            # The worker is most likely stuck, give up on it
+                            return
+                        continue
+                    reply = conn.recv()
+                except (OSError, EOFError, pickle.UnpicklingError) as error:
+                    if task_id is not None and not timed_out:
+                        retry(task_id, repr(error))
+                    return
+                if reply[0] == 'error':
+                    if not timed_out:
+                        retry(task_id, reply[2])
+                    task_id = None
+                    continue
+                with lock:
+                    if results[task_id] is None:
+                        # A timed out attempt is already counted
+                        reply[2][2].update({'task': task_id, 'worker': "%s:%d" % address,
+                                            'attempts': attempts[task_id] + (0 if timed_out else 1),
+                                            'elapsed': time.time() - start_time})
+                        results[task_id] = reply[2]
+                task_id = None
+            try:
+                conn.send(('close',))
+            except OSError:
+                pass
+
+    threads = [threading.Thread(target=drive, args=(address,), daemon=True) for address in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if len(errors) > 0:
+        raise RuntimeError(errors[0])
+    if any(result is None for result in results):
+        raise RuntimeError("No worker left to anonymize %d sub-partitions" % sum(result is None for result in results))
+    return results
+
+
+def mondrian_distributed(att_trees: List[GenTree | NumRange], data: list[list[str]], k: int, workers: list[tuple[str, int]],
+                         QI_num=-1, split_depth=3, timeout: float | None = None, max_attempts=3, authkey: bytes | None = None):
+    """
+    basic Mondrian for k-anonymity on worker processes (see serve_worker).
+    The coordinator splits the partitions down to split_depth, and the workers anonymize the pending sub-partitions.
+    The closed partitions are merged in the depth-first order of a single run, so the result, the NCP and the
+    partition tree (see mondrian.get_split_model) are the same as mondrian(att_trees, data, k, QI_num).
+    The metrics of the sub-partitions are stored in TASK_METRICS.
+
+        Parameters
+        ----------
+        workers : list
+            The (host, port) addresses of the workers
+        split_depth : int
+            The depth of the partition tree the coordinator splits, up to 2 ** split_depth sub-partitions
+        timeout : float
+            The seconds to wait for a worker, before its sub-partition is also sent to another one
+        max_attempts : int
+            The number of failures of a sub-partition before the run fails with a RuntimeError
+        authkey : bytes
+            The key shared with the workers, get_authkey() by default
+
+    Returns
+    -------
+    (list, (float, float))
+        like mondrian
+    """
+
+    global TASK_METRICS
+    start_time = time.time()
+    init(att_trees, data, k, QI_num)
+    attribute_width_list, attribute_generalization_list = init_qi_range()
+    qi_num = mondrian_module.NUM_OF_QIDS_USED
+    whole_partition = Partition(data, attribute_width_list, attribute_generalization_list, qi_num)
+    mondrian_module.SPLIT_ROOT = whole_partition.node
+    slots, tasks = split_top(whole_partition, split_depth)
+
+    # Only the hierarchies of the QIDs used are sent
+    init_frame = pickle.dumps(('init', list(att_trees[:qi_num]), k, qi_num), pickle.HIGHEST_PROTOCOL)
+    results = run_tasks(tasks, workers, init_frame, qi_num, timeout, max_attempts, authkey or get_authkey())
+    TASK_METRICS = [result[2] for result in results]
+
+    # Number the ECs again, in the order of a single run
+    mondrian_module.RESULT = []
+    mondrian_module.RECORDS_FINALIZED = 0
+    for slot in slots:
+        if isinstance(slot, Partition):
+            close_partition(slot)
+            continue
+        task = tasks[slot]
+        root, closed, _ = results[slot]
+        # Graft the partition tree of the worker under the node of the sub-partition
+        task.node.__dict__.update(root.__dict__)
+        for members_bytes, width_list, generalization_list, node in closed:
+            members = array('I')
+            members.frombytes(members_bytes)
+            partition = Partition([task.members[i] for i in members], width_list, generalization_list, qi_num)
+            partition.node = task.node if node is root else node
+            close_partition(partition)
+    rtime = float(time.time() - start_time)
+
+    result = []
+    ncp = 0.0
+    for partition in mondrian_module.RESULT:
+        r_ncp = 0.0
+        for i in range(qi_num):
+            r_ncp += get_normalized_width(partition, i)
+        for record in partition.members:
+            result.append(partition.attribute_generalization_list + [record[-1]])
+        ncp += r_ncp * len(partition)
+    ncp /= qi_num
+    ncp /= len(data)
+    ncp *= 100
+    return result, (ncp, rtime)
+
+
+if __name__ == '__main__':
+    from anonymizer import DEFAULT_K
+    from utils.read_adult_data import read_data, read_tree
+
+    if len(sys.argv) > 1 and sys.argv[1] in ('worker', 'coordinator') and not os.environ.get(AUTHKEY_VARIABLE):
+        print("Set the same secret key in %s for the workers and the coordinator" % AUTHKEY_VARIABLE)
+        sys.exit(1)
+    if len(sys.argv) > 1 and sys.argv[1] == 'worker':
+        PORT = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+        HOST = sys.argv[3] if len(sys.argv) > 3 else '127.0.0.1'
+        PORT_QUEUE = queue.Queue()
+        threading.Thread(target=lambda: print("Worker listening on port %d" % PORT_QUEUE.get()), daemon=True).start()
+        serve_worker(HOST, PORT, PORT_QUEUE)
+    elif len(sys.argv) > 2 and sys.argv[1] in ('coordinator', 'local'):
+        if sys.argv[1] == 'local':
+            PROCESSES, WORKERS = start_local_workers(int(sys.argv[2]))
+        else:
+            WORKERS = [(address.split(':')[0], int(address.split(':')[1])) for address in sys.argv[2:]]
+        RESULT, (NCP, RTIME) = mondrian_distributed(read_tree(), read_data(), DEFAULT_K, WORKERS)
+        for METRICS in TASK_METRICS:
+            print("sub-partition %d on %s: %d records, %d ECs, %0.2f seconds" % (
+                METRICS['task'], METRICS['worker'], METRICS['records'], METRICS['partitions'], METRICS['rtime']))
+        print("NCP %0.2f%%" % NCP)
+        print("Running time %0.2f seconds" % RTIME)
+    else:
+        print("Usage: python distributed.py worker [port [host]]")
+        print("       python distributed.py coordinator host:port [host:port ...]")
+        print("       python distributed.py local number_of_workers")
+        print("The worker and coordinator modes need a secret key shared by all of them in %s" % AUTHKEY_VARIABLE)
@@ -0,0 +1,74 @@
+import threading
+import unittest
+
+from multiprocessing.connection import Listener
+
+import distributed
+from distributed import get_authkey, mondrian_distributed, start_local_workers
+from fixtures import read_adult_sample
+from mondrian import mondrian
+
+
+def start_failing_worker(keep_open=False, authkey: bytes | None = None) -> tuple[str, int]:
+    """ Start a worker that receives the first task of each connection and never answers it:
+    it closes the connection, or keeps it open until the coordinator closes it if keep_open is True """
+
+    listener = Listener(('127.0.0.1', 0), authkey=authkey or get_authkey())
+
+    def serve():
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception:
+                continue
+            with conn:
+                conn.recv()
+                conn.recv()
+                while keep_open and conn.recv()[0] != 'close':
+                    pass
+
+    threading.Thread(target=serve, daemon=True).start()
+    return listener.address
+
+
+class distributedTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.processes, cls.workers = start_local_workers(2)
+
+    @classmethod
+    def tearDownClass(cls):
+        for process in cls.processes:
+            process.terminate()
+            process.join()
+
+    def setUp(self):
+        self.data, self.att_trees = read_adult_sample()
+
+    def test_same_as_single_node(self):
+        result, (ncp, _) = mondrian(self.att_trees, self.data, 10)
+        distributed_result, (distributed_ncp, _) = mondrian_distributed(
+            self.att_trees, self.data, 10, [start_failing_worker()] + self.workers)
+        self.assertEqual(distributed_result, result)
+        self.assertEqual(distributed_ncp, ncp)
+
+    def test_timeout(self):
+        result, (ncp, _) = mondrian(self.att_trees, self.data, 10)
+        distributed_result, (distributed_ncp, _) = mondrian_distributed(
+            self.att_trees, self.data, 10, [start_failing_worker(True)] + self.workers, timeout=0.5)
+        self.assertEqual(distributed_result, result)
+        # The task of the silent worker is counted as an attempt, and done by another worker
+        self.assertTrue(any(metrics['attempts'] == 2 for metrics in distributed.TASK_METRICS))
+
+    def test_no_worker_left(self):
+        with self.assertRaises(RuntimeError):
+            mondrian_distributed(self.att_trees, self.data, 10, [start_failing_worker()])
+
+    def test_authentication(self):
+        # A worker with another key is never sent the data
+        with self.assertRaises(RuntimeError):
+            mondrian_distributed(self.att_trees, self.data, 10, [start_failing_worker(authkey=b'another key')])
+
+
+if __name__ == '__main__':
+    unittest.main()
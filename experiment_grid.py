@@ -0,0 +1,104 @@
+"""
+run basic_mondrian over a grid of experiment settings in parallel
+"""
+
+# !/usr/bin/env python
+# coding=utf-8
+import csv
+import json
+import random
+
+from itertools import product
+from multiprocessing import Pool
+from typing import List
+
+from models.gentree import GenTree
+from models.numrange import NumRange
+from mondrian import mondrian
+
+GRID_FIELDS = ['k', 'qi_num', 'size', 'repetition', 'seed', 'ncp', 'rtime']
+
+# Read-only state of the worker processes, set once by init_worker
+# With the fork start method the dataset is inherited from the parent, it is neither pickled nor copied
+WORKER_ATT_TREES: List[GenTree | NumRange] = []
+WORKER_DATA: list[list[str]] = []
+
+
+def init_worker(att_trees: List[GenTree | NumRange], data: list[list[str]]):
+    """ Store the shared hierarchies and dataset in the worker process """
+
+    global WORKER_ATT_TREES, WORKER_DATA
+    WORKER_ATT_TREES = att_trees
+    WORKER_DATA = data
+
+
+def get_sample(data: list[list[str]], size: int, seed: str) -> list[list[str]]:
+    """ Take a reproducible random sample of the dataset
+
+    The records are not copied, the sample refers to the same (read-only) lists as the dataset
+    """
+
+    if size >= len(data):
+        return data
+    return random.Random(seed).sample(data, size)
+
+
+def run_cell(cell: tuple[int, int, int, int, int]) -> dict:
+    """ Run Mondrian once for one cell of the grid and return the measured metrics """
+
+    k, qi_num, size, repetition, seed = cell
+    # The sample only depends on the size and the repetition, thus the same sample is used for every k and QI count
+    sample = get_sample(WORKER_DATA, size, "%d-%d-%d" % (seed, size, repetition))
+    _, (ncp, rtime) = mondrian(WORKER_ATT_TREES, sample, k, qi_num)
+
+    return {'k': k, 'qi_num': qi_num, 'size': len(sample), 'repetition': repetition,
+            'seed': seed, 'ncp': round(ncp, 4), 'rtime': round(rtime, 4)}
+
+
+def run_grid(att_trees: List[GenTree | NumRange], data: list[list[str]], k_values: list[int],
+             qi_values: list[int] | None = None, sizes: list[int] | None = None, repetitions=1,
+             seed=0, processes: int | None = None) -> list[dict]:
+    """
+    Run Mondrian for the cross product of (k, QI count, sample size, repetition) on a process pool.
+
+        Parameters
+        ----------
+        qi_values : list[int]
+            The number of QIDs to use, -1 means all of them (default)
+        sizes : list[int]
+            The sample sizes, defaults to the size of the whole dataset
+        repetitions : int
+            How many different random samples to anonymize for each sample size
+        seed : int
+            The base seed of the sampling, the same seed always gives the same samples
+        processes : int
+            The size of the process pool, defaults to the number of CPUs
+
+    Returns
+    -------
+    list[dict]
+        one row per cell of the grid, with the keys listed in GRID_FIELDS, in the order of the cross product
+    """
+
+    if qi_values is None:
+        qi_values = [-1]
+    if sizes is None:
+        sizes = [len(data)]
+
+    cells = [(k, qi_num, size, repetition, seed)
+             for (k, qi_num, size, repetition) in product(k_values, qi_values, sizes, range(repetitions))]
+
+    with Pool(processes, initializer=init_worker, initargs=(att_trees, data)) as pool:
+        return pool.map(run_cell, cells, chunksize=1)
+
+
+def write_grid_results(rows: list[dict], path: str):
+    """ Write the results of run_grid as JSON if the path ends with .json, as CSV otherwise """
+
+    with open(path, "w", newline='') as output:
+        if path.endswith('.json'):
+            json.dump(rows, output, indent=2)
+        else:
+            writer = csv.DictWriter(output, fieldnames=GRID_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
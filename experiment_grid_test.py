@@ -0,0 +1,27 @@
+import unittest
+
+from experiment_grid import run_grid, get_sample
+from fixtures import SMALL_DATA as DATA, get_small_trees
+
+
+class gridTest(unittest.TestCase):
+    def test_sample_is_reproducible(self):
+        self.assertEqual(get_sample(DATA, 4, "0-4-1"), get_sample(DATA, 4, "0-4-1"))
+        self.assertIs(get_sample(DATA, 8, "0-8-0"), DATA)
+
+    def test_grid(self):
+        att_trees = get_small_trees()
+        rows = run_grid(att_trees, DATA, [2, 4], [1, -1], [4, 8], 2, processes=2)
+        self.assertEqual(len(rows), 2 * 2 * 2 * 2)
+        self.assertEqual([(r['k'], r['qi_num'], r['size'], r['repetition']) for r in rows[:3]],
+                         [(2, 1, 4, 0), (2, 1, 4, 1), (2, 1, 8, 0)])
+        # k=2 on the whole dataset with all QIDs, see test1_mondrian
+        full = [r for r in rows if r['k'] == 2 and r['qi_num'] == -1 and r['size'] == 8]
+        for r in full:
+            self.assertTrue(abs(r['ncp'] - 100.0 / 36) < 0.05)
+        again = run_grid(att_trees, DATA, [2, 4], [1, -1], [4, 8], 2, processes=2)
+        self.assertEqual([r['ncp'] for r in rows], [r['ncp'] for r in again])
+
+
+if __name__ == '__main__':
+    unittest.main()
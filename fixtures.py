@@ -0,0 +1,71 @@
+"""
+shared fixtures of the tests
+"""
+
+# !/usr/bin/env python
+# coding=utf-8
+from models.gentree import GenTree
+from models.numrange import NumRange
+from utils.read_adult_data import ATT_NAMES, get_num_range, get_qi_selection, read_data, read_tree_file
+
+# Records of the small hierarchies (see get_small_trees): a categorical QID, a numeric QID and the SA
+SMALL_DATA = [['6', '1', 'haha'],
+              ['6', '1', 'test'],
+              ['8', '2', 'haha'],
+              ['8', '2', 'test'],
+              ['4', '1', 'hha'],
+              ['4', '2', 'hha'],
+              ['4', '3', 'hha'],
+              ['4', '4', 'hha']]
+# Records of the small hierarchies with duplicated QID values
+DUPLICATE_DATA = [['6', '1', 'haha'],
+                  ['6', '1', 'test'],
+                  ['8', '2', 'haha'],
+                  ['8', '2', 'test'],
+                  ['4', '1', 'hha'],
+                  ['4', '1', 'hha'],
+                  ['1', '1', 'hha'],
+                  ['2', '1', 'hha']]
+
+# The records of data/adult.data, parsed once per test process
+ADULT_DATA: dict = {}
+
+
+def get_small_trees(max_bins=None, binning='quantile') -> list:
+    """ Return the hierarchies of SMALL_DATA: '*' -> '1,5' | '6,10' -> 1..10, and the numeric range 1..10 """
+
+    tree_temp = {}
+    tree = GenTree('*')
+    tree_temp['*'] = tree
+    lt = GenTree('1,5', tree)
+    tree_temp['1,5'] = lt
+    rt = GenTree('6,10', tree)
+    tree_temp['6,10'] = rt
+    for i in range(1, 11):
+        if i <= 5:
+            t = GenTree(str(i), lt, True)
+        else:
+            t = GenTree(str(i), rt, True)
+        tree_temp[str(i)] = t
+    numrange = NumRange([str(i) for i in range(1, 11)], dict(), max_bins, binning)
+    return [tree_temp, numrange]
+
+
+def read_adult_sample(rows=3000, max_bins=None, qi_names: list[str] | None = None) -> tuple[list[list[str]], list]:
+    """
+    Return the first rows records of the adult dataset and their hierarchies.
+    The NumRanges are built from the sample, so no static pickle is read or written into data/.
+    """
+
+    key = tuple(qi_names) if qi_names is not None else None
+    if key not in ADULT_DATA:
+        ADULT_DATA[key] = read_data(write_static=False, qi_names=qi_names)
+    data = ADULT_DATA[key][:rows]
+    qi_index, is_cat = get_qi_selection(qi_names)
+    att_trees = []
+    for i, index in enumerate(qi_index):
+        if is_cat[i]:
+            att_trees.append(read_tree_file(ATT_NAMES[index]))
+        else:
+            att_trees.append(get_num_range(data, i, max_bins))
+    return data, att_trees
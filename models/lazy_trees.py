@@ -0,0 +1,29 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+# Generalization hierarchies read on first use
+
+from collections.abc import Sequence
+
+
+class LazyTrees(Sequence):
+
+    """Class for the list of the generalization hierarchies of the QIDs, each one is read the first time it is used.
+    A slice is a plain list of the hierarchies it covers, so att_trees[:n] only reads the first n of them.
+    self.loaders: for each QID, the function (without arguments) that reads its hierarchy
+    self.trees: the hierarchies read so far, None for the others
+    """
+
+    def __init__(self, loaders):
+        self.loaders = list(loaders)
+        self.trees = [None] * len(self.loaders)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if self.trees[index] is None:
+            self.trees[index] = self.loaders[index]()
+        return self.trees[index]
+
+    def __len__(self):
+        return len(self.loaders)
@@ -13,9 +13,15 @@ class NumRange(object):
     self.support: support (frequency) of all values, dict
     self.range: (max-min), used for normalized width
     self.cover: leaves nodes of current node
+    self.bins: (low, high) values of the base bins, None if each value is a bin of its own, see build_bins
+    self.bin_of_value: index of the bin of each value, dict
     """
 
-    def __init__(self, sort_value, support):
+    # Class attributes, so that the NumRanges pickled before binning existed still read as unbinned
+    bins = None
+    bin_of_value = None
+
+    def __init__(self, sort_value, support, max_bins=None, binning='quantile'):
         self.sort_value = list(sort_value)
         self.support = support.copy()
         # sometimes the values may be str
@@ -24,3 +30,49 @@ class NumRange(object):
         for i, v in enumerate(sort_value):
             self.dict[v] = i
         self.value = sort_value[0] + ',' + sort_value[-1]
+        if max_bins is not None and len(self.sort_value) > max_bins:
+            self.build_bins(max_bins, binning)
+
+    def build_bins(self, max_bins, binning='quantile'):
+        """
+        Group the sorted values into at most max_bins contiguous base bins.
+        Mondrian then counts and splits the QID per bin, so the work per partition
+        is bounded by max_bins whatever the number of distinct values.
+        'quantile' bins hold about the same number of records (from support, every value counts once without it),
+        'width' bins cover ranges of the same width. A value never spans two bins.
+        """
+        if binning == 'quantile':
+            weights = [self.support.get(v, 1) for v in self.sort_value]
+            total = float(sum(weights))
+            positions = []
+            records_before = 0
+            for weight in weights:
+                positions.append(min(int(records_before * max_bins / total), max_bins - 1))
+                records_before += weight
+        elif binning == 'width':
+            low = float(self.sort_value[0])
+            width = self.range / max_bins
+            if width == 0:
+                width = 1.0
+            positions = [min(int((float(v) - low) / width), max_bins - 1) for v in self.sort_value]
+        else:
+            raise ValueError("Unknown binning %s, use 'quantile' or 'width'" % binning)
+
+        # Number the non-empty bins consecutively
+        self.bins = []
+        self.bin_of_value = {}
+        last_position = -1
+        for v, position in zip(self.sort_value, positions):
+            if position != last_position:
+                self.bins.append([v, v])
+                last_position = position
+            self.bins[-1][1] = v
+            self.bin_of_value[v] = len(self.bins) - 1
+        self.bins = [tuple(b) for b in self.bins]
+
+    def get_max_bin_width(self):
+        """ Return the largest normalized width of a bin, 0 if the values are not binned """
+
+        if self.bins is None or self.range == 0:
+            return 0.0
+        return max(float(high) - float(low) for low, high in self.bins) / self.range
@@ -1,3 +1,6 @@
+from models.split_model import SplitNode
+
+
 class Partition(object):
 
     """Class for Group, which is used to keep records
@@ -7,6 +10,8 @@ class Partition(object):
         self.attribute_width_list: the width, for categoric attribute, it equal the number of leaf node, for numeric attribute, it equal to number range
         self.attribute_generalization_list: the result of the generalization
         self.allow: 0 if the partition cannot be split further along the attribute, 1 otherwise
+    self.node: the node of the partition in the partition tree
+    self.frequency_sets: frequency sets of the attributes already counted in the partition, under the index of the attribute
     """
 
     def __init__(self, data, attribute_width_list, attribute_generalization_list, qi_len):
@@ -14,6 +19,8 @@ class Partition(object):
         self.attribute_width_list = list(attribute_width_list)
         self.attribute_generalization_list = list(attribute_generalization_list)
         self.attribute_split_allowed_list = [1] * qi_len
+        self.frequency_sets = {}
+        self.node = SplitNode()
 
     # The number of records in partition
     def __len__(self):        
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+# Partition tree discovered by Mondrian, used to generalize new records consistently with a release
+
+import json
+
+from typing import Dict, List
+
+from models.gentree import GenTree
+from models.numrange import NumRange
+
+
+class SplitNode(object):
+
+    """Class for the nodes of the partition tree.
+    self.qid_index: the QID the partition was split along, -1 if the partition is an equivalence class
+    self.cut: numeric QID: the value the partition was split at, records <= cut belong to the first child
+              categorical QID: the values of the hierarchy nodes of the children
+    self.cut_rank: numeric QID: the index of the cut in NumRange.sort_value
+    self.children: the nodes of the sub-partitions
+    self.ec_id: the index of the equivalence class in the result of Mondrian, -1 for inner nodes
+    self.generalization: the generalized QID values of the equivalence class, None for inner nodes
+    """
+
+    def __init__(self):
+        self.qid_index = -1
+        self.cut: str | List[str] = ''
+        self.cut_rank = -1
+        self.children: List[SplitNode] = []
+        self.ec_id = -1
+        self.generalization: List[str] | None = None
+
+    def to_dict(self) -> dict:
+        """ Return the subtree as nested dicts of the compact model format """
+
+        if self.qid_index == -1:
+            return {'ec': self.ec_id, 'gen': self.generalization}
+        result = {'qid': self.qid_index, 'cut': self.cut, 'children': [child.to_dict() for child in self.children]}
+        if self.cut_rank != -1:
+            result['rank'] = self.cut_rank
+        return result
+
+    @staticmethod
+    def from_dict(node_dict: dict) -> 'SplitNode':
+        """ Build the subtree from nested dicts of the compact model format """
+
+        node = SplitNode()
+        if 'ec' in node_dict:
+            node.ec_id = node_dict['ec']
+            node.generalization = node_dict['gen']
+        else:
+            node.qid_index = node_dict['qid']
+            node.cut = node_dict['cut']
+            node.cut_rank = node_dict.get('rank', -1)
+            node.children = [SplitNode.from_dict(child) for child in node_dict['children']]
+        return node
+
+
+class SplitModel(object):
+
+    """Class for a persisted partition tree, which assigns new records to the equivalence classes of a release.
+    self.root: the root SplitNode
+    self.is_categorical: for each QID used, True if it is categorical
+    self.att_trees: the generalization hierarchies of the QIDs used
+    """
+
+    def __init__(self, root: SplitNode, is_categorical: List[bool], att_trees: List[Dict[str, GenTree] | NumRange]):
+        self.root = root
+        self.is_categorical = list(is_categorical)
+        self.att_trees = att_trees
+        # For the nodes split along categorical QIDs, the index of the child that covers each leaf value
+        self.child_index_of_value: Dict[int, Dict[str, int]] = {}
+        # For the numeric QIDs, the (min, max) of every generalized value, so they are only parsed once
+        self.bounds: Dict[str, tuple[int, int]] = {}
+        self.compile(root)
+
+    def compile(self, node: SplitNode):
+        """ Prepare the lookup tables used to route records """
+
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.qid_index == -1:
+                for i, value in enumerate(node.generalization):
+                    if self.is_categorical[i] is False and value not in self.bounds:
+                        range_min_and_max = value.split(',')
+                        self.bounds[value] = (int(range_min_and_max[0]), int(range_min_and_max[-1]))
+                continue
+            if self.is_categorical[node.qid_index]:
+                lookup = {}
+                for i, child_value in enumerate(node.cut):
+                    for leaf_value in self.att_trees[node.qid_index][child_value].cover:
+                        lookup[leaf_value] = i
+                self.child_index_of_value[id(node)] = lookup
+            stack.extend(node.children)
+
+    def covers(self, node: SplitNode, record: list[str]) -> bool:
+        """ Check if the generalized values of an equivalence class cover the QID values of the record """
+
+        for i, value in enumerate(node.generalization):
+            if self.is_categorical[i]:
+                if record[i] not in self.att_trees[i][value].cover:
+                    return False
+            else:
+                low, high = self.bounds[value]
+                if not low <= int(record[i]) <= high:
+                    return False
+        return True
+
+    def assign(self, records: list[list[str]]) -> tuple[list[int], list[List[str] | None]]:
+        """
+        Route a batch of records through the partition tree.
+        The whole batch is pushed down the tree together, one level at a time, so each record costs O(depth).
+
+        Returns
+        -------
+        (list[int], list[list[str] | None])
+            ec_ids: the index of the equivalence class of each record, -1 if it does not fit into any of them
+                (a categorical value unknown to the hierarchy, or a numeric value outside the ranges of the release)
+            generalizations: the generalized QID values of each record, None if the record could not be assigned
+        """
+
+        ec_ids = [-1] * len(records)
+        generalizations: list[List[str] | None] = [None] * len(records)
+
+        stack = [(self.root, list(range(len(records))))]
+        while stack:
+            node, indices = stack.pop()
+            if len(indices) == 0:
+                continue
+
+            if node.qid_index == -1:
+                for i in indices:
+                    if self.covers(node, records[i]):
+                        ec_ids[i] = node.ec_id
+                        generalizations[i] = node.generalization
+                continue
+
+            qid_index = node.qid_index
+            child_indices: list[list[int]] = [[] for _ in node.children]
+            if self.is_categorical[qid_index]:
+                lookup = self.child_index_of_value[id(node)]
+                for i in indices:
+                    try:
+                        child_indices[lookup[records[i][qid_index]]].append(i)
+                    except KeyError:
+                        continue
+            else:
+                cut = int(node.cut)
+                left, right = child_indices
+                for i in indices:
+                    if int(records[i][qid_index]) <= cut:
+                        left.append(i)
+                    else:
+                        right.append(i)
+
+            for child, child_index_list in zip(node.children, child_indices):
+                stack.append((child, child_index_list))
+
+        return ec_ids, generalizations
+
+    def save(self, path: str):
+        """ Write the model to a JSON file """
+
+        with open(path, "w") as output:
+            json.dump({'is_categorical': self.is_categorical, 'root': self.root.to_dict()}, output, separators=(',', ':'))
+
+    @staticmethod
+    def load(path: str, att_trees: List[Dict[str, GenTree] | NumRange]) -> 'SplitModel':
+        """ Read a model written by save, the generalization hierarchies must be the ones used by the release """
+
+        with open(path) as model_file:
+            model_dict = json.load(model_file)
+        return SplitModel(SplitNode.from_dict(model_dict['root']), model_dict['is_categorical'], att_trees)
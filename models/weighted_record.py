@@ -0,0 +1,25 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+# Group of records with identical QID values
+
+
+class WeightedRecord(list):
+
+    """Class for a group of records that share the same QID values, used in place of its records by Mondrian.
+    The list holds the QID values followed by the first sensitive value, like a plain record does.
+    self.weight: the number of records in the group
+    self.sensitive_values: the sensitive value of each record of the group
+    """
+
+    def __init__(self, qid_values, sensitive_value):
+        super().__init__(qid_values)
+        self.append(sensitive_value)
+        self.weight = 1
+        self.sensitive_values = [sensitive_value]
+
+    def add(self, sensitive_value):
+        """ Add one more record of the same QID values to the group """
+
+        self.weight += 1
+        self.sensitive_values.append(sensitive_value)
@@ -6,6 +6,7 @@ main module of basic Mondrian
 # coding=utf-8
 
 
+import os
 import pdb
 import time
 
@@ -14,6 +15,10 @@ from models.gentree import GenTree
 
 from models.numrange import NumRange
 from models.partition import Partition
+from models.split_model import SplitModel, SplitNode
+from utils.split_tracer import SplitTracer
+from utils.checkpoint import get_data_fingerprint, load_checkpoint, save_checkpoint
+from utils.dedup import collapse_duplicates
 
 
 __DEBUG = False
@@ -22,7 +27,34 @@ GLOBAL_K = 0
 RESULT: List[Partition] = []
 ATT_TREES: List[GenTree | NumRange] = []
 IS_QID_CATEGORICAL: List[bool] = []
+# True if the members of the partitions are WeightedRecord groups, see mondrian(dedup=True)
+WEIGHTED = False
 QI_RANGE = []
+# The root of the partition tree of the last run, see get_split_model
+SPLIT_ROOT = SplitNode()
+# Records the spans of the partition visits, if given to mondrian
+TRACER: SplitTracer | None = None
+# The pending partitions of anonymize with their depth, the last one is visited next
+FRONTIER: List[tuple[Partition | None, int | tuple]] = []
+# Where and how often (in seconds) to save the state of the run, no checkpoints are written if CHECKPOINT_PATH is None
+CHECKPOINT_PATH: str | None = None
+CHECKPOINT_INTERVAL = 60.0
+CHECKPOINT_DATA: list[list[str]] = []
+# The index of each record (by id) in CHECKPOINT_DATA, built at the first checkpoint
+RECORD_INDEX: dict[int, int] = {}
+# The time (time.time()) at which the run stops and closes its pending partitions, None for no deadline
+DEADLINE: float | None = None
+# Stops the run like the deadline once it is set, any object with is_set() such as a threading.Event
+CANCEL_EVENT = None
+# Called with a progress report (see report_progress) every PROGRESS_INTERVAL seconds and at the end of the run
+PROGRESS_CALLBACK = None
+PROGRESS_INTERVAL = 1.0
+# The number of records of the run and of the closed partitions, and the time the run started
+RECORDS_TOTAL = 0
+RECORDS_FINALIZED = 0
+START_TIME = 0.0
+# True if the last run was stopped by its deadline or cancelled
+STOPPED = False
 
 
 def get_normalized_width(partition: Partition, qid_index: int) -> float:    
@@ -70,8 +102,63 @@ def choose_qid(partition: Partition) -> int:
     return qid_index
 
 
+def get_frequency_sets(partition: Partition, qid_indices: list[int]) -> dict[int, dict[str, int]]:
+    """ Generate the frequency sets of several attributes with a single scan of the partition
+
+    The numeric attributes with base bins (see NumRange.build_bins) are counted per bin: their keys are bin indices.
+
+    Returns
+    -------
+    dict
+        the keys are the indices of the attributes, while the values are their frequency sets (see get_frequency_set)
+    """
+
+    frequency_sets: dict[int, dict[str, int]] = {}
+    for qid_index in qid_indices:
+        frequency_sets[qid_index] = {}
+    items = list(frequency_sets.items())
+    bin_of_values = {qid_index: ATT_TREES[qid_index].bin_of_value for qid_index in qid_indices
+                     if IS_QID_CATEGORICAL[qid_index] is False and ATT_TREES[qid_index].bins is not None}
+
+    if WEIGHTED or len(bin_of_values) > 0:
+        keyed_items = [(qid_index, frequency_set, bin_of_values.get(qid_index)) for qid_index, frequency_set in items]
+        weight = 1
+        for record in partition.members:
+            # Each group counts as many times as the records it stands for
+            if WEIGHTED:
+                weight = record.weight
+            for qid_index, frequency_set, bin_of_value in keyed_items:
+                key = record[qid_index] if bin_of_value is None else bin_of_value[record[qid_index]]
+                try:
+                    frequency_set[key] += weight
+                except KeyError:
+                    frequency_set[key] = weight
+        return frequency_sets
+
+    for record in partition.members:
+        for qid_index, frequency_set in items:
+            try:
+                frequency_set[record[qid_index]] += 1
+            except KeyError:
+                frequency_set[record[qid_index]] = 1
+    return frequency_sets
+
+
+def get_partition_size(partition: Partition) -> int:
+    """ Return the number of records in the partition, counting the records of the groups if the run is weighted """
+
+    if WEIGHTED:
+        return sum(record.weight for record in partition.members)
+    return len(partition)
+
+
 def get_frequency_set(partition: Partition, qid_index: int) -> dict[str, int]:
     """ Count the number of unique values in the dataset for the attribute with the specified index, and thus generate a frequency set    
+
+    The frequency sets are cached in the partition, whose members are scanned at most twice, whatever the number of attempts
+    to split it. The first attempt only scans the attribute that was chosen, as most partitions split on their first choice.
+    If that split fails, the frequency sets of all the other attributes still allowed to be split are generated in one
+    single scan, so the following attempts do not touch the members any more.
     
     Returns
     -------
@@ -79,13 +166,19 @@ def get_frequency_set(partition: Partition, qid_index: int) -> dict[str, int]:
         the keys are unique string values of the attribute, while the values are the count per unique key
     """
 
-    frequency_set = {}
-    for record in partition.members:
-        try:
-            frequency_set[record[qid_index]] += 1
-        except KeyError:
-            frequency_set[record[qid_index]] = 1
-    return frequency_set
+    try:
+        return partition.frequency_sets[qid_index]
+    except KeyError:
+        pass
+
+    if len(partition.frequency_sets) == 0:
+        qid_indices = [qid_index]
+    else:
+        qid_indices = [i for i in range(NUM_OF_QIDS_USED)
+                       if (partition.attribute_split_allowed_list[i] == 1 or i == qid_index) and i not in partition.frequency_sets]
+
+    partition.frequency_sets.update(get_frequency_sets(partition, qid_indices))
+    return partition.frequency_sets[qid_index]
 
 
 def get_median(partition: Partition, qid_index: int) -> Tuple[str, str, str, str]:
@@ -100,11 +193,40 @@ def get_median(partition: Partition, qid_index: int) -> Tuple[str, str, str, str
         unique_values[-1]
     """
 
-    frequency_set = get_frequency_set(partition, qid_index)    
-    # Sort the unique values for the attribute with the specified index
-    unique_values = list(frequency_set.keys())
-    unique_values.sort(key=lambda x: int(x))
-    
+    return get_median_of_frequency_set(get_frequency_set(partition, qid_index), qid_index)
+
+
+def get_median_of_frequency_set(frequency_set: dict, qid_index: int) -> Tuple[str, str, str, str]:
+    """ Find the middle of a partition from the frequency set of a numeric QID, however it was counted, see get_median.
+    The keys are the values of the QID, or the bin indices if its NumRange has bins (see get_frequency_sets). """
+
+    numrange = ATT_TREES[qid_index]
+    if numrange.bins is not None:
+        # Find the median bin, and then return the values at the bounds of the bins
+        (bin_to_split_at, next_bin, min_bin, max_bin) = get_bin_median(numrange, frequency_set)
+        min_value = numrange.bins[min_bin][0]
+        max_value = numrange.bins[max_bin][1]
+        if bin_to_split_at == '' or bin_to_split_at == next_bin:
+            return ('', '', min_value, max_value)
+        return (numrange.bins[bin_to_split_at][1], numrange.bins[next_bin][0], min_value, max_value)
+    return find_median(frequency_set, sorted(frequency_set.keys(), key=lambda x: int(x)))
+
+
+def get_bin_median(numrange: NumRange, frequency_set: dict) -> tuple:
+    """ Find the median bin of the partition, the frequency set holds either bin indices or values (from the other backends) """
+
+    bin_frequency_set = frequency_set
+    if any(isinstance(key, str) for key in frequency_set):
+        bin_frequency_set = {}
+        for value, count in frequency_set.items():
+            bin_index = numrange.bin_of_value[value]
+            bin_frequency_set[bin_index] = bin_frequency_set.get(bin_index, 0) + count
+    return find_median(bin_frequency_set, sorted(bin_frequency_set.keys()))
+
+
+def find_median(frequency_set: dict, unique_values: list) -> tuple:
+    """ Find the median of the sorted unique values of a frequency set, see get_median """
+
     # The number of records in the partition
     num_of_records = sum(frequency_set.values())
     middle_index_of_the_records = num_of_records / 2
@@ -164,7 +286,11 @@ def split_numerical_attribute(partition: Partition, qid_index: int) -> list[Part
 
     sub_partitions: List[Partition] = []
 
+    if TRACER is not None:
+        start = TRACER.now()
     (unique_value_to_split_at, next_unique_value, min_unique_value, max_unique_value) = get_median(partition, qid_index)
+    if TRACER is not None:
+        TRACER.complete('get_median', start, {'qid': qid_index, 'size': len(partition), 'median': unique_value_to_split_at})
 
     p_low = ATT_TREES[qid_index].dict[min_unique_value]
     p_high = ATT_TREES[qid_index].dict[max_unique_value]
@@ -222,39 +348,47 @@ def split_categorical_attribute(partition: Partition, qid_index: int) -> list[Pa
     node_to_split_at = ATT_TREES[qid_index][partition.attribute_generalization_list[qid_index]]
     child_nodes = node_to_split_at.children[:]    
 
-    sub_groups = []
-    for i in range(len(child_nodes)):
-        sub_groups.append([])
-
     # If the node (has no children, and thus) is a leaf, the partitioning is not possible >> []
-    if len(sub_groups) == 0:        
+    if len(child_nodes) == 0:
         return []
-    
-    for record in partition.members:
-        qid_value = record[qid_index]
+
+    # Decide if the split is valid from the frequency set, before touching the records of the partition
+    frequency_set = get_frequency_set(partition, qid_index)
+    # The index of the child node that covers the unique values of the attribute
+    child_index_of_value: dict[str, int] = {}
+    sub_group_sizes = [0] * len(child_nodes)
+
+    for qid_value, count in frequency_set.items():
         for i, node in enumerate(child_nodes):
-            try:
-                node.cover[qid_value]
-                # Store the records in the sub_groups array under the index that corresponds to the index of the child of the current node
-                sub_groups[i].append(record)
+            if qid_value in node.cover:
+                child_index_of_value[qid_value] = i
+                sub_group_sizes[i] += count
                 break
-            except KeyError:
-                continue
-        # If for one of the records of the partition we do not find a QID value from the child nodes of the current node, it cannot be generalized
-        # In this case, the try block never reaches the break, thus the for runs all the way to the end and the execution reaches this else branch
+        # If one of the QID values of the partition is not covered by any child node of the current node, it cannot be generalized
         else:
             print("Generalization hierarchy error!")
 
     flag = True
-    for sub_group in sub_groups:
-        if len(sub_group) == 0:
+    for sub_group_size in sub_group_sizes:
+        if sub_group_size == 0:
             continue
         # If one child covers less than k elements, the split is invalid
-        if len(sub_group) < GLOBAL_K:
+        if sub_group_size < GLOBAL_K:
             flag = False
             break
 
+    sub_groups = []
+    for i in range(len(child_nodes)):
+        sub_groups.append([])
+
     if flag:
+        for record in partition.members:
+            # Store the records in the sub_groups array under the index that corresponds to the index of the child of the current node
+            try:
+                sub_groups[child_index_of_value[record[qid_index]]].append(record)
+            except KeyError:
+                continue
+
         for i, sub_group in enumerate(sub_groups):
             if len(sub_group) == 0:
                 continue
@@ -273,37 +407,196 @@ def split_categorical_attribute(partition: Partition, qid_index: int) -> list[Pa
 
 def split_partition(partition: Partition, qid_index: int):
     """ Split partition and distribute records to different sub-partitions """    
+    if TRACER is not None:
+        start = TRACER.now()
+
     if IS_QID_CATEGORICAL[qid_index] is False:
-        return split_numerical_attribute(partition, qid_index)
+        sub_partitions = split_numerical_attribute(partition, qid_index)
+        routine = 'split_numerical_attribute'
     else:
-        return split_categorical_attribute(partition, qid_index)
+        sub_partitions = split_categorical_attribute(partition, qid_index)
+        routine = 'split_categorical_attribute'
+
+    if TRACER is not None:
+        TRACER.complete(routine, start, {'qid': qid_index, 'size': len(partition), 'sub_partitions': len(sub_partitions)})
+    return sub_partitions
 
 
 def anonymize(partition: Partition):
     """ Main procedure of Half_Partition. Recursively partition groups until not allowable.
+    The recursion runs on the FRONTIER stack of pending partitions, in the same depth-first order as a recursive call would.
+    """
+
+    FRONTIER.append((partition, 0))
+    run_frontier()
+
+
+def run_frontier():
+    """ Visit the pending partitions of FRONTIER until none is left, writing checkpoints if they are enabled.
+    At the deadline or on cancellation, the pending partitions are closed as they are (see close_frontier).
+    """
+    global STOPPED
+
+    last_checkpoint = time.time()
+    last_progress = last_checkpoint
+    while FRONTIER:
+        partition, depth = FRONTIER.pop()
+        # The end of the subtree of a traced partition, see visit
+        if partition is None:
+            TRACER.complete('partition', *depth)
+            continue
+
+        visit(partition, depth)
+
+        now = time.time()
+        if (DEADLINE is not None and now >= DEADLINE) or (CANCEL_EVENT is not None and CANCEL_EVENT.is_set()):
+            STOPPED = True
+            close_frontier()
+        if CHECKPOINT_PATH is not None and now - last_checkpoint >= CHECKPOINT_INTERVAL:
+            write_checkpoint()
+            last_checkpoint = time.time()
+        if PROGRESS_CALLBACK is not None and now - last_progress >= PROGRESS_INTERVAL:
+            report_progress()
+            last_progress = now
+
+    if PROGRESS_CALLBACK is not None:
+        report_progress()
+
+
+def close_frontier():
+    """ Close all the pending partitions as ECs.
+    Every pending partition comes from a split that a full run would also make, and its generalization covers its records.
+    A full run only splits it further, so stopping early adds no class below k that the full run would not have
+    (the numerical median split can already leave a half smaller than k): the result is only coarser.
+    """
+
+    while FRONTIER:
+        partition, depth = FRONTIER.pop()
+        if partition is None:
+            TRACER.complete('partition', *depth)
+            continue
+        if TRACER is not None:
+            start = TRACER.now()
+        close_partition(partition)
+        if TRACER is not None:
+            TRACER.complete('partition', start, {'size': get_partition_size(partition), 'depth': depth, 'qid': -1,
+                                                 'outcome': 'stopped', 'ec_id': partition.node.ec_id, 'failed_qids': []})
+
+
+def close_partition(partition: Partition):
+    """ Add the partition to RESULT as an EC """
+
+    global RECORDS_FINALIZED
+    # The frequency sets are not needed any more, do not keep them alive in RESULT
+    partition.frequency_sets = {}
+    partition.node.ec_id = len(RESULT)
+    partition.node.generalization = partition.attribute_generalization_list[:]
+    RESULT.append(partition)
+    RECORDS_FINALIZED += get_partition_size(partition)
+
+
+def report_progress():
+    """
+    Call PROGRESS_CALLBACK with a dict:
+        records_finalized: the number of records in closed partitions
+        records_total: the number of records of the run
+        partitions_closed: the number of ECs so far
+        partitions_pending: the number of partitions in FRONTIER
+        elapsed: the seconds since the start of the run
+        eta: the estimated seconds left, from the rate records were finalized at so far (None before the first EC)
+        stopped: True if the run was stopped by its deadline or cancelled
+    """
+
+    elapsed = time.time() - START_TIME
+    eta = None
+    if RECORDS_FINALIZED > 0:
+        eta = elapsed * (RECORDS_TOTAL - RECORDS_FINALIZED) / RECORDS_FINALIZED
+    PROGRESS_CALLBACK({'records_finalized': RECORDS_FINALIZED, 'records_total': RECORDS_TOTAL,
+                       'partitions_closed': len(RESULT),
+                       'partitions_pending': sum(1 for partition, _ in FRONTIER if partition is not None),
+                       'elapsed': elapsed, 'eta': eta, 'stopped': STOPPED})
+
+
+def visit(partition: Partition, depth: int):
+    """ Split the partition along the QID with the largest normalized width that allows it, or close it as an EC.
+    The sub-partitions are pushed to FRONTIER.
     """
     # print(len(partition)
     # print(partition.attribute_split_allowed_list
     # pdb.set_trace()
 
-    # Close the EC, if not splittable any more
-    if check_splitable(partition) is False:
-        RESULT.append(partition)
+    if TRACER is not None:
+        start = TRACER.now()
+        failed_qids = []
+
+    # Try the QIDs one after the other, until a split succeeds
+    while check_splitable(partition):
+        qid_index = choose_qid(partition)
+        if qid_index == -1:
+            print("Error: qid_index=-1")
+            pdb.set_trace()
+
+        sub_partitions = split_partition(partition, qid_index)
+        if len(sub_partitions) == 0:
+            # Close the attribute for this partition, as it cannot be split any more
+            partition.attribute_split_allowed_list[qid_index] = 0
+            if TRACER is not None:
+                failed_qids.append(qid_index)
+            continue
+
+        # The frequency sets of the partition are not needed any more
+        partition.frequency_sets = {}
+        record_split(partition, qid_index, sub_partitions)
+
+        if TRACER is not None:
+            # The span of the partition covers its whole subtree, it is closed once all sub-partitions are popped
+            FRONTIER.append((None, (start, {'size': get_partition_size(partition), 'depth': depth, 'qid': qid_index,
+                                            'outcome': 'split', 'sub_partitions': len(sub_partitions),
+                                            'failed_qids': failed_qids})))
+        # Push in reverse order, so the first sub-partition is visited first
+        for sub_p in reversed(sub_partitions):
+            FRONTIER.append((sub_p, depth + 1))
         return
-    
-    qid_index = choose_qid(partition)
-    if qid_index == -1:
-        print("Error: qid_index=-1")
-        pdb.set_trace()
 
-    sub_partitions = split_partition(partition, qid_index)
-    if len(sub_partitions) == 0:
-        # Close the attribute for this partition, as it cannot be split any more
-        partition.attribute_split_allowed_list[qid_index] = 0
-        anonymize(partition)
+    # Close the EC, if not splittable any more
+    close_partition(partition)
+
+    if TRACER is not None:
+        TRACER.complete('partition', start, {'size': get_partition_size(partition), 'depth': depth, 'qid': -1,
+                                             'outcome': 'closed', 'ec_id': partition.node.ec_id,
+                                             'failed_qids': failed_qids})
+
+
+def write_checkpoint():
+    """ Save the pending and the closed partitions to CHECKPOINT_PATH """
+
+    global RECORD_INDEX
+    if len(RECORD_INDEX) == 0:
+        RECORD_INDEX = {id(record): i for i, record in enumerate(CHECKPOINT_DATA)}
+    # The ends of the trace spans are not saved
+    frontier = [(partition, depth) for partition, depth in FRONTIER if partition is not None]
+    save_checkpoint(CHECKPOINT_PATH, get_data_fingerprint(CHECKPOINT_DATA, GLOBAL_K, NUM_OF_QIDS_USED),
+                    frontier, RESULT, SPLIT_ROOT, RECORD_INDEX)
+
+
+def record_split(partition: Partition, qid_index: int, sub_partitions: list[Partition]):
+    """ Store the split of the partition in its node of the partition tree """
+
+    node = partition.node
+    node.qid_index = qid_index
+    node.children = [sub_p.node for sub_p in sub_partitions]
+    if IS_QID_CATEGORICAL[qid_index] is False:
+        # The left sub-partition ends at the value the partition was split at
+        node.cut = sub_partitions[0].attribute_generalization_list[qid_index].split(',')[-1]
+        node.cut_rank = ATT_TREES[qid_index].dict[node.cut]
     else:
-        for sub_p in sub_partitions:
-            anonymize(sub_p)
+        node.cut = [sub_p.attribute_generalization_list[qid_index] for sub_p in sub_partitions]
+
+
+def get_split_model() -> SplitModel:
+    """ Return the partition tree of the last run of mondrian, which can assign new records to its equivalence classes """
+
+    return SplitModel(SPLIT_ROOT, IS_QID_CATEGORICAL[:NUM_OF_QIDS_USED], ATT_TREES[:NUM_OF_QIDS_USED])
 
 
 def check_splitable(partition: Partition):
@@ -315,19 +608,47 @@ def check_splitable(partition: Partition):
     return True
 
 
-def init(att_trees: List[GenTree | NumRange], data, k: int, QI_num=-1):
+def get_binning_loss_bound(att_trees: List[GenTree | NumRange], QI_num=-1) -> float:
+    """
+    Return a bound of the extra NCP percentage caused by the base bins of the numeric QIDs.
+    The bounds of the generalized ranges are those of the bins, so a range is widened by
+    at most one bin on each side: 2 * the largest normalized width of a bin, per binned QID.
+    The split points also move to the bounds of the bins, so the partitions may differ from an unbinned run.
+    """
+    if QI_num <= 0:
+        QI_num = len(att_trees)
+    bound = 0.0
+    for tree in att_trees[:QI_num]:
+        if isinstance(tree, NumRange):
+            bound += min(2 * tree.get_max_bin_width(), 1.0)
+    return bound / QI_num * 100
+
+
+def init(att_trees: List[GenTree | NumRange], data, k: int, QI_num=-1, tracer: SplitTracer | None = None,
+         checkpoint_path: str | None = None, checkpoint_interval=60.0, time_budget: float | None = None,
+         cancel_event=None, progress=None, progress_interval=1.0):
     """ Reset all global variables """
 
     # To change the value of a global variable inside a function, refer to the variable by using the global keyword:
-    global GLOBAL_K, RESULT, NUM_OF_QIDS_USED, ATT_TREES, QI_RANGE, IS_QID_CATEGORICAL
+    global GLOBAL_K, RESULT, NUM_OF_QIDS_USED, ATT_TREES, QI_RANGE, IS_QID_CATEGORICAL, TRACER, FRONTIER, WEIGHTED
+    global CHECKPOINT_PATH, CHECKPOINT_INTERVAL, CHECKPOINT_DATA, RECORD_INDEX
+    global DEADLINE, CANCEL_EVENT, PROGRESS_CALLBACK, PROGRESS_INTERVAL, RECORDS_TOTAL, RECORDS_FINALIZED, START_TIME, STOPPED
     ATT_TREES = att_trees
-
-    # Based on the received attribute tree, map the attributes into a boolean array that reflects if they are categorical or not
-    for tree in att_trees:
-        if isinstance(tree, NumRange):
-            IS_QID_CATEGORICAL.append(False)
-        else:
-            IS_QID_CATEGORICAL.append(True)
+    TRACER = tracer
+    FRONTIER = []
+    CHECKPOINT_PATH = checkpoint_path
+    CHECKPOINT_INTERVAL = checkpoint_interval
+    CHECKPOINT_DATA = data
+    RECORD_INDEX = {}
+    WEIGHTED = False
+    START_TIME = time.time()
+    DEADLINE = START_TIME + time_budget if time_budget is not None else None
+    CANCEL_EVENT = cancel_event
+    PROGRESS_CALLBACK = progress
+    PROGRESS_INTERVAL = progress_interval
+    RECORDS_TOTAL = len(data)
+    RECORDS_FINALIZED = 0
+    STOPPED = False
 
     # Use all QIDs in this case
     if QI_num <= 0:
@@ -337,21 +658,23 @@ def init(att_trees: List[GenTree | NumRange], data, k: int, QI_num=-1):
         # Use only the desired number of QIDs
         NUM_OF_QIDS_USED = QI_num
 
+    # Based on the received attribute tree, map the attributes into a boolean array that reflects if they are categorical or not
+    # Only the QIDs used are looked at, so the hierarchies of the others are never read (see LazyTrees)
+    IS_QID_CATEGORICAL = []
+    for tree in att_trees[:NUM_OF_QIDS_USED]:
+        if isinstance(tree, NumRange):
+            IS_QID_CATEGORICAL.append(False)
+        else:
+            IS_QID_CATEGORICAL.append(True)
+
     GLOBAL_K = k
     RESULT = []
     QI_RANGE = []
 
 
-def mondrian(att_trees: list[GenTree | NumRange], data: list[list[str]], k: int, QI_num=-1):
-    """
-    basic Mondrian for k-anonymity.
-    This fuction support both numeric values and categoric values.
-    For numeric values, each iterator is a mean split.
-    For categoric values, each iterator is a split on GH.
-    The final result is returned in 2-dimensional list.
-    """
-    init(att_trees, data, k, QI_num)
-    result = []
+def init_qi_range() -> tuple[list, list[str]]:
+    """ Fill QI_RANGE, and return the width and the generalization lists of the partition that covers the whole domain """
+
     attribute_generalization_list = []
     attribute_width_list = []
 
@@ -364,11 +687,61 @@ def mondrian(att_trees: list[GenTree | NumRange], data: list[list[str]], k: int,
             QI_RANGE.append(len(ATT_TREES[i]['*']))
             attribute_width_list.append(len(ATT_TREES[i]['*']))
             attribute_generalization_list.append('*')
+    return attribute_width_list, attribute_generalization_list
+
+
+def mondrian(att_trees: list[GenTree | NumRange], data: list[list[str]], k: int, QI_num=-1, tracer: SplitTracer | None = None,
+             checkpoint_path: str | None = None, checkpoint_interval=60.0, resume=False, dedup=False,
+             time_budget: float | None = None, cancel_event=None, progress=None, progress_interval=1.0,
+             qi_indices: list[int] | None = None):
+    """
+    basic Mondrian for k-anonymity.
+    This fuction support both numeric values and categoric values.
+    For numeric values, each iterator is a mean split.
+    For categoric values, each iterator is a split on GH.
+    The final result is returned in 2-dimensional list.
+    If a SplitTracer is given, it records the spans of the partition visits (see SplitTracer.export).
+    If a checkpoint_path is given, the pending and closed partitions are saved there every checkpoint_interval seconds.
+    With resume=True, the run continues from that checkpoint (if it exists) and gives the same result as an uninterrupted run.
+    The checkpoint is deleted once the run is finished.
+    With dedup=True, the records with identical QID values are collapsed into weighted groups before partitioning,
+    so the work scales with the number of distinct QID combinations. The groups are expanded in the result.
+    If a time_budget (in seconds) is given, or once cancel_event.is_set() (e.g. a threading.Event set by another thread),
+    the run stops and closes its pending partitions: the result is coarser, with no class below k that a full run would not have.
+    STOPPED tells if that happened. progress is called with a report (see report_progress) every progress_interval seconds.
+    With qi_indices, only those QIDs (positions in the records and in att_trees) are used, in that order,
+    like QI_num for the first ones: the result holds the generalized values of those QIDs followed by the SA.
+    """
+    global SPLIT_ROOT, RESULT, WEIGHTED, CHECKPOINT_DATA, RECORDS_FINALIZED
+    if qi_indices is not None:
+        # The first QIDs in their order need no copy of the records, it is the same as QI_num
+        if list(qi_indices) != list(range(len(qi_indices))):
+            att_trees = [att_trees[i] for i in qi_indices]
+            data = [[record[i] for i in qi_indices] + [record[-1]] for record in data]
+        QI_num = len(qi_indices)
+    init(att_trees, data, k, QI_num, tracer, checkpoint_path, checkpoint_interval, time_budget, cancel_event, progress,
+         progress_interval)
+    records = data
+    if dedup:
+        records = collapse_duplicates(data, NUM_OF_QIDS_USED)
+        WEIGHTED = True
+        CHECKPOINT_DATA = records
+    result = []
+    attribute_width_list, attribute_generalization_list = init_qi_range()
 
-    whole_partition = Partition(data, attribute_width_list, attribute_generalization_list, NUM_OF_QIDS_USED)
-    
     start_time = time.time()
-    anonymize(whole_partition)
+    if resume and checkpoint_path is not None and os.path.exists(checkpoint_path):
+        frontier, RESULT, SPLIT_ROOT = load_checkpoint(checkpoint_path, get_data_fingerprint(records, k, NUM_OF_QIDS_USED), records)
+        RECORDS_FINALIZED = sum(get_partition_size(partition) for partition in RESULT)
+        FRONTIER.extend(frontier)
+        run_frontier()
+    else:
+        whole_partition = Partition(records, attribute_width_list, attribute_generalization_list, NUM_OF_QIDS_USED)
+        SPLIT_ROOT = whole_partition.node
+        anonymize(whole_partition)
+
+    if checkpoint_path is not None and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
 
     rtime = float(time.time() - start_time)
     ncp = 0.0
@@ -377,9 +750,14 @@ def mondrian(att_trees: list[GenTree | NumRange], data: list[list[str]], k: int,
         for i in range(NUM_OF_QIDS_USED):
             r_ncp += get_normalized_width(partition, i)
         temp = partition.attribute_generalization_list
-        for i in range(len(partition)):
-            result.append(temp + [partition.members[i][-1]])
-        r_ncp *= len(partition)
+        if WEIGHTED:
+            for record in partition.members:
+                for sensitive_value in record.sensitive_values:
+                    result.append(temp + [sensitive_value])
+        else:
+            for i in range(len(partition)):
+                result.append(temp + [partition.members[i][-1]])
+        r_ncp *= get_partition_size(partition)
         ncp += r_ncp
     # covert to NCP percentage
     ncp /= NUM_OF_QIDS_USED
@@ -0,0 +1,166 @@
+"""
+estimate the NCP of basic_mondrian for a range of k values from samples of the dataset
+"""
+
+# !/usr/bin/env python
+# coding=utf-8
+import math
+import random
+import sys
+
+from typing import Dict, List
+
+from models.gentree import GenTree
+from models.numrange import NumRange
+from mondrian import mondrian
+
+# Two-sided 95% quantiles of the t distribution, under the degrees of freedom, 1.96 is used above 30
+T_QUANTILES_95 = [0.0, 12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+                  2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+                  2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+
+
+def get_stratum(att_tree: Dict[str, GenTree] | NumRange, value: str) -> str:
+    """ Return the stratum of a QID value: the top-level category of the hierarchy, or the value itself for numeric QIDs """
+
+    if isinstance(att_tree, NumRange):
+        return value
+    try:
+        node = att_tree[value]
+    except KeyError:
+        return value
+    # parents[-1] is the root '*', the node right under it is the top-level category
+    if len(node.parents) >= 2:
+        return node.parents[-2].value
+    return node.value
+
+
+def stratified_sample(data: list[list[str]], fraction: float, strata_index: int,
+                      att_tree: Dict[str, GenTree] | NumRange, rand: random.Random) -> list[list[str]]:
+    """ Sample the same fraction of the records from every stratum of the QID with index strata_index """
+
+    strata: Dict[str, list[list[str]]] = {}
+    for record in data:
+        try:
+            strata[get_stratum(att_tree, record[strata_index])].append(record)
+        except KeyError:
+            strata[get_stratum(att_tree, record[strata_index])] = [record]
+
+    sample = []
+    # Sort the strata, so that the same seed always gives the same sample
+    for key in sorted(strata):
+        members = strata[key]
+        sample.extend(rand.sample(members, max(1, round(len(members) * fraction))))
+    return sample
+
+
+def get_confidence_interval(values: list[float]) -> tuple[float, float, float]:
+    """ Return the mean and the bounds of its 95% confidence interval """
+
+    mean = sum(values) / len(values)
+    if len(values) < 2:
+        return mean, mean, mean
+    std = math.sqrt(sum((v - mean) ** 2 for v in values) / (len(values) - 1))
+    df = len(values) - 1
+    quantile = T_QUANTILES_95[df] if df < len(T_QUANTILES_95) else 1.96
+    half_width = quantile * std / math.sqrt(len(values))
+    return mean, mean - half_width, mean + half_width
+
+
+def estimate_ncp(att_trees: List[Dict[str, GenTree] | NumRange], data: list[list[str]], k_values: list[int],
+                 fraction=0.1, repetitions=5, seed=0, QI_num=-1, strata_index: int | None = None,
+                 max_rows: int | None = None) -> list[dict]:
+    """
+    Estimate the NCP of Mondrian for several k values, without anonymizing the whole dataset.
+    Each repetition anonymizes a stratified sample of the records with k scaled by the sampling fraction,
+    since a class of k records in the dataset corresponds to a class of about k * fraction records in the sample.
+    The NumRanges of the whole dataset are kept, so the normalized widths of the sample are comparable to a full run.
+
+    The classes of a sample cover fewer distinct values than the classes of the whole dataset, so the NCP of a sample is too low.
+    The bias roughly halves each time the fraction doubles, thus each repetition also anonymizes a half-size sub-sample
+    and extrapolates: NCP = 2 * NCP(sample) - NCP(half sample).
+    The scaled k is at least 1, so k values below 2 / fraction are estimated on nearly unconstrained samples
+    and their NCP is underestimated, a larger fraction (or an exact run) suits them better.
+
+    The same samples are used for all k values, and the repetitions stop before the samples and half samples of the
+    whole k list add up to max_rows records, so the estimate of the whole k list costs less than a single exact run
+    by default. A single repetition gives no confidence interval (ci_low = ci_high = ncp). If not even one repetition fits
+    (the fraction is too large for the number of k values), Mondrian is simply run on the whole dataset.
+
+        Parameters
+        ----------
+        fraction : float
+            The fraction of the records in a sample
+        repetitions : int
+            The largest number of samples
+        strata_index : int
+            The QID to stratify on, defaults to the first categorical QID
+        max_rows : int
+            The largest number of records anonymized for the whole k list, defaults to len(data)
+
+    Returns
+    -------
+    list[dict]
+        one row per k with the keys k, fraction, sample_k, ncp (the mean over the samples),
+        ci_low and ci_high (95% confidence interval), repetitions (the number of samples)
+        and rows_processed (the number of records anonymized for the estimate)
+    """
+
+    if strata_index is None:
+        strata_index = 0
+        for i, tree in enumerate(att_trees):
+            if not isinstance(tree, NumRange):
+                strata_index = i
+                break
+    if max_rows is None:
+        max_rows = len(data)
+
+    # The (sample, half sample) pairs, shared by all k values
+    samples: list[tuple[list[list[str]], list[list[str]]]] = []
+    if fraction < 1.0:
+        rand = random.Random("%d-%f" % (seed, fraction))
+        rows_processed = 0
+        for _ in range(repetitions):
+            sample = stratified_sample(data, fraction, strata_index, att_trees[strata_index], rand)
+            half_sample = stratified_sample(sample, 0.5, strata_index, att_trees[strata_index], rand)
+            # Every k value anonymizes the sample and its half, stop before the whole k list exceeds max_rows
+            if rows_processed + (len(sample) + len(half_sample)) * len(k_values) >= max_rows:
+                break
+            samples.append((sample, half_sample))
+            rows_processed += (len(sample) + len(half_sample)) * len(k_values)
+
+    estimates = []
+    for k in k_values:
+        if not samples:
+            ncp = mondrian(att_trees, data, k, QI_num)[1][0]
+            estimates.append({'k': k, 'fraction': 1.0, 'sample_k': k, 'ncp': ncp, 'ci_low': ncp, 'ci_high': ncp,
+                              'repetitions': 1, 'rows_processed': len(data)})
+            continue
+
+        sample_k = max(1, round(k * fraction))
+        half_sample_k = max(1, round(k * fraction / 2))
+        ncps = []
+        rows_processed = 0
+        for sample, half_sample in samples:
+            sample_ncp = mondrian(att_trees, sample, sample_k, QI_num)[1][0]
+            half_sample_ncp = mondrian(att_trees, half_sample, half_sample_k, QI_num)[1][0]
+            ncps.append(2 * sample_ncp - half_sample_ncp)
+            rows_processed += len(sample) + len(half_sample)
+        ncp, ci_low, ci_high = get_confidence_interval(ncps)
+        estimates.append({'k': k, 'fraction': fraction, 'sample_k': sample_k, 'ncp': ncp, 'ci_low': ci_low, 'ci_high': ci_high,
+                          'repetitions': len(ncps), 'rows_processed': rows_processed})
+    return estimates
+
+
+if __name__ == '__main__':
+    from utils.read_adult_data import read_data, read_tree
+
+    FRACTION = 0.1
+    if len(sys.argv) > 1:
+        FRACTION = float(sys.argv[1])
+    RAW_DATA = read_data()
+    ATT_TREES = read_tree()
+    for estimate in estimate_ncp(ATT_TREES, RAW_DATA, [10, 20, 30, 50, 100, 200], FRACTION):
+        print("K=%d (K=%d on %d %d%% samples, %d records): NCP %0.2f%% [%0.2f%%, %0.2f%%]" % (
+            estimate['k'], estimate['sample_k'], estimate['repetitions'], estimate['fraction'] * 100, estimate['rows_processed'],
+            estimate['ncp'], estimate['ci_low'], estimate['ci_high']))
@@ -0,0 +1,48 @@
+import random
+import unittest
+
+from mondrian import mondrian
+from ncp_estimator import estimate_ncp, get_confidence_interval, stratified_sample
+from fixtures import read_adult_sample
+
+
+class ncpEstimatorTest(unittest.TestCase):
+    def test_confidence_interval(self):
+        self.assertEqual(get_confidence_interval([2.0]), (2.0, 2.0, 2.0))
+        mean, low, high = get_confidence_interval([1.0, 2.0, 3.0])
+        self.assertAlmostEqual(mean, 2.0)
+        self.assertAlmostEqual(high - mean, 4.303 / 3 ** 0.5, places=3)
+
+    def test_estimate(self):
+        data, att_trees = read_adult_sample()
+        sample = stratified_sample(data, 0.1, 1, att_trees[1], random.Random(0))
+        self.assertTrue(abs(len(sample) - 300) < 10)
+
+        estimates = estimate_ncp(att_trees, data, [20, 100], 0.1, 3)
+        # Small k values are estimated from the same samples, with k scaled down too
+        self.assertEqual([e['fraction'] for e in estimates], [0.1, 0.1])
+        self.assertEqual([e['sample_k'] for e in estimates], [2, 10])
+        for estimate in estimates:
+            self.assertEqual(estimate['repetitions'], 3)
+            self.assertTrue(estimate['ci_low'] <= estimate['ncp'] <= estimate['ci_high'])
+
+    def test_cost_bound(self):
+        data, att_trees = read_adult_sample()
+        k_values = [2, 5, 20, 50, 100]
+        # 10% samples and their halves: 450 records per k value and repetition
+        estimates = estimate_ncp(att_trees, data, k_values, 0.1, 5)
+        # The whole k list processes less records than a single exact run
+        self.assertTrue(sum(e['rows_processed'] for e in estimates) < len(data))
+        self.assertEqual({(e['fraction'], e['repetitions']) for e in estimates}, {(0.1, 1)})
+        estimates = estimate_ncp(att_trees, data, k_values, 0.1, 5, max_rows=3 * len(data))
+        self.assertTrue(sum(e['rows_processed'] for e in estimates) < 3 * len(data))
+        self.assertEqual({e['repetitions'] for e in estimates}, {3})
+
+        # Not even one repetition fits, the whole dataset is anonymized
+        estimates = estimate_ncp(att_trees, data, [20, 50], 0.5, 5)
+        self.assertEqual([(e['fraction'], e['rows_processed']) for e in estimates], [(1.0, len(data))] * 2)
+        self.assertAlmostEqual(estimates[1]['ncp'], mondrian(att_trees, data, 50)[1][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
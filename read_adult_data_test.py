@@ -0,0 +1,65 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from fixtures import read_adult_sample
+from mondrian import mondrian
+from utils.read_adult_data import read_chunk, read_data, read_tree
+
+
+class readAdultDataTest(unittest.TestCase):
+    def test_chunks(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'small.data')
+            with open('data/adult.data') as data_file:
+                lines = [next(data_file) for _ in range(50)]
+            with open(path, 'w') as small:
+                small.writelines(lines)
+            size = os.path.getsize(path)
+            data, _ = read_chunk(path, 0, size)
+
+            # Every line belongs to exactly one chunk, whatever the byte ranges are
+            for bounds in [[0, 1, size], [0, len(lines[0]), len(lines[0]) + 1, size], [0, 100, 777, 3001, size]]:
+                chunked = []
+                for i in range(len(bounds) - 1):
+                    chunked.extend(read_chunk(path, bounds[i], bounds[i + 1])[0])
+                self.assertEqual(chunked, data)
+
+            self.assertEqual(read_data(path, False, processes=3), data)
+
+    def test_qi_selection(self):
+        data = read_data(write_static=False)
+        static_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_dir)
+        selected = read_data(qi_names=['sex', 'age'], static_dir=static_dir)
+        self.assertEqual(os.listdir(static_dir), ['adult_age_static.pickle'])
+        self.assertEqual(selected, [[record[6], record[0], record[-1]] for record in data])
+        with self.assertRaises(ValueError):
+            read_data(write_static=False, qi_names=['final_weight'])
+        with self.assertRaises(ValueError):
+            read_data(write_static=False, qi_names=[])
+        # The static files of the numeric QIDs not selected were not written
+        with self.assertRaises(FileNotFoundError):
+            read_tree(static_dir=static_dir)[2]
+
+        # Only the hierarchies of the QIDs used are read
+        att_trees = read_tree(static_dir=static_dir)
+        self.assertEqual(att_trees.trees, [None] * 8)
+        result, (ncp, _) = mondrian(att_trees, data[:2000], 10, qi_indices=[6, 0])
+        self.assertEqual([tree is not None for tree in att_trees.trees], [True] + [False] * 5 + [True, False])
+
+        selected_result, (selected_ncp, _) = mondrian(read_tree(qi_names=['sex', 'age'], static_dir=static_dir), selected[:2000], 10)
+        self.assertEqual(selected_result, result)
+        self.assertEqual(selected_ncp, ncp)
+
+        # The first QIDs in their order are the same as QI_num
+        sample, sample_trees = read_adult_sample(2000)
+        prefix_result, (prefix_ncp, _) = mondrian(sample_trees, sample, 10, qi_indices=[0, 1, 2])
+        qi_num_result, (qi_num_ncp, _) = mondrian(sample_trees, sample, 10, 3)
+        self.assertEqual(prefix_result, qi_num_result)
+        self.assertEqual(prefix_ncp, qi_num_ncp)
+
+
+if __name__ == '__main__':
+    unittest.main()
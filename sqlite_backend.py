@@ -0,0 +1,274 @@
+"""
+run basic_mondrian on a SQLite table, computing the frequency sets with GROUP BY queries
+"""
+
+# !/usr/bin/env python
+# coding=utf-8
+import sqlite3
+import time
+
+from typing import Dict, List
+
+import mondrian as mondrian_module
+from models.gentree import GenTree
+from models.numrange import NumRange
+from models.partition import Partition
+from mondrian import check_splitable, choose_qid, get_median_of_frequency_set, get_normalized_width, init, init_qi_range
+
+
+class SQLitePartition(Partition):
+
+    """Class for a partition of a table, which only knows the number of its records, never the records themselves.
+    self.count: the number of records in the partition
+    self.pid: the partition id, the rows of the partition hold it in the partition id column (see SQLiteMondrian)
+    """
+
+    def __init__(self, count, attribute_width_list, attribute_generalization_list, qi_len):
+        super().__init__([], attribute_width_list, attribute_generalization_list, qi_len)
+        self.count = count
+        self.pid = 0
+
+    def __len__(self):
+        return self.count
+
+
+def quote(name: str) -> str:
+    """ Quote a table or column name for SQLite """
+
+    return '"' + name.replace('"', '""') + '"'
+
+
+def load_table(conn: sqlite3.Connection, table: str, data: list[list[str]], qi_columns: list[str], sa_column: str,
+               is_cat: list[bool]):
+    """ Create a table from records (QID values followed by the SA value), the numeric QIDs are stored as integers """
+
+    columns = ['%s %s' % (quote(name), 'TEXT' if is_cat[i] else 'INTEGER') for i, name in enumerate(qi_columns)]
+    columns.append('%s TEXT' % quote(sa_column))
+    conn.execute('CREATE TABLE %s (%s)' % (quote(table), ', '.join(columns)))
+    conn.executemany('INSERT INTO %s VALUES (%s)' % (quote(table), ', '.join(['?'] * (len(qi_columns) + 1))),
+                     ([record[i] if is_cat[i] else int(record[i]) for i in range(len(qi_columns))] + [record[-1]] for record in data))
+    conn.commit()
+
+
+class SQLiteMondrian(object):
+
+    """Class for running Mondrian on a table of a SQLite database.
+    self.conn: the connection to the database
+    self.table: the name of the table
+    self.qi_columns: the names of the QID columns, in the order of the hierarchies
+    self.pid_column: the (quoted) column that holds the partition id of each row.
+        While running, the ids of the partitions are negative, the closed partitions are renumbered to their EC ids at the end.
+    self.leaves: for each categorical QID, the leaf values under each hierarchy node, to build the conditions
+    self.partition_num: the number of partition ids given out
+    """
+
+    def __init__(self, conn: sqlite3.Connection, table: str, qi_columns: list[str], pid_column: str):
+        self.conn = conn
+        self.table = table
+        self.qi_columns = qi_columns
+        self.pid_column = quote(pid_column)
+        self.leaves: Dict[int, Dict[str, list[str]]] = {}
+        self.partition_num = 0
+
+    def create_pid_column(self):
+        """ Add the indexed partition id column to the table, and put every row into the root partition """
+
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(%s)' % quote(self.table))]
+        if self.pid_column[1:-1].replace('""', '"') not in columns:
+            self.conn.execute('ALTER TABLE %s ADD COLUMN %s INTEGER' % (quote(self.table), self.pid_column))
+        self.conn.execute('UPDATE %s SET %s = 0' % (quote(self.table), self.pid_column))
+        index_name = quote('mondrian_%s_%s' % (self.table, self.pid_column[1:-1]))
+        self.conn.execute('CREATE INDEX IF NOT EXISTS %s ON %s (%s)' % (index_name, quote(self.table), self.pid_column))
+
+    def get_leaves(self, qid_index: int, node_value: str) -> list[str]:
+        """ Return the leaf values covered by a hierarchy node """
+
+        try:
+            return self.leaves[qid_index][node_value]
+        except KeyError:
+            pass
+        cover = mondrian_module.ATT_TREES[qid_index][node_value].cover
+        leaves = [value for value, node in cover.items() if len(node.children) == 0]
+        self.leaves.setdefault(qid_index, {})[node_value] = leaves
+        return leaves
+
+    def get_condition(self, qid_index: int, partition: SQLitePartition) -> tuple[str, list]:
+        """ Return the condition (and its parameters) on the split QID that selects the records of a sub-partition """
+
+        column = quote(self.qi_columns[qid_index])
+        if mondrian_module.IS_QID_CATEGORICAL[qid_index] is False:
+            high = partition.attribute_width_list[qid_index][1]
+            return 'CAST(%s AS INTEGER) <= ?' % column, [int(mondrian_module.ATT_TREES[qid_index].sort_value[high])]
+        leaves = self.get_leaves(qid_index, partition.attribute_generalization_list[qid_index])
+        return '%s IN (%s)' % (column, ', '.join(['?'] * len(leaves))), leaves
+
+    def move_records(self, partition: SQLitePartition, qid_index: int, sub_partitions: list[SQLitePartition]):
+        """ Move the rows of a partition to its sub-partitions, by updating their partition id """
+
+        for sub_p in sub_partitions:
+            self.partition_num += 1
+            sub_p.pid = -self.partition_num
+        # The rows left over after the other sub-partitions took theirs belong to the last one
+        for sub_p in sub_partitions[:-1]:
+            condition, parameters = self.get_condition(qid_index, sub_p)
+            self.conn.execute('UPDATE %s SET %s = ? WHERE %s = ? AND %s' % (quote(self.table), self.pid_column, self.pid_column, condition),
+                              [sub_p.pid, partition.pid] + parameters)
+        self.conn.execute('UPDATE %s SET %s = ? WHERE %s = ?' % (quote(self.table), self.pid_column, self.pid_column),
+                          [sub_partitions[-1].pid, partition.pid])
+
+    def get_frequency_set(self, partition: Partition, qid_index: int) -> dict[str, int]:
+        """ Count the values of a QID in the partition with a GROUP BY query, and cache it in the partition """
+
+        try:
+            return partition.frequency_sets[qid_index]
+        except KeyError:
+            pass
+        column = quote(self.qi_columns[qid_index])
+        if mondrian_module.IS_QID_CATEGORICAL[qid_index] is False:
+            column = 'CAST(%s AS INTEGER)' % column
+        rows = self.conn.execute('SELECT %s, COUNT(*) FROM %s WHERE %s = ? GROUP BY 1' % (column, quote(self.table), self.pid_column),
+                                 [partition.pid])
+        frequency_set = {str(value): count for value, count in rows}
+        partition.frequency_sets[qid_index] = frequency_set
+        return frequency_set
+
+    def split_numerical_attribute(self, partition: SQLitePartition, qid_index: int) -> list[SQLitePartition]:
+        """ Split the partition at the median of a numeric QID, see mondrian.split_numerical_attribute """
+
+        frequency_set = self.get_frequency_set(partition, qid_index)
+        numrange = mondrian_module.ATT_TREES[qid_index]
+        (unique_value_to_split_at, next_unique_value, min_unique_value, max_unique_value) = get_median_of_frequency_set(frequency_set, qid_index)
+
+        if min_unique_value == max_unique_value:
+            partition.attribute_generalization_list[qid_index] = min_unique_value
+        else:
+            partition.attribute_generalization_list[qid_index] = min_unique_value + ',' + max_unique_value
+        partition.attribute_width_list[qid_index] = (numrange.dict[min_unique_value], numrange.dict[max_unique_value])
+
+        if unique_value_to_split_at == '' or unique_value_to_split_at == next_unique_value:
+            return []
+
+        middle_value_index = numrange.dict[unique_value_to_split_at]
+        l_count = sum(count for value, count in frequency_set.items() if numrange.dict[value] <= middle_value_index)
+
+        l_attribute_width_list = partition.attribute_width_list[:]
+        r_attribute_width_list = partition.attribute_width_list[:]
+        l_attribute_width_list[qid_index] = (partition.attribute_width_list[qid_index][0], middle_value_index)
+        r_attribute_width_list[qid_index] = (numrange.dict[next_unique_value], partition.attribute_width_list[qid_index][1])
+
+        l_attribute_generalization_list = partition.attribute_generalization_list[:]
+        r_attribute_generalization_list = partition.attribute_generalization_list[:]
+        l_attribute_generalization_list[qid_index], r_attribute_generalization_list[qid_index] = mondrian_module.split_numerical_value(
+            partition.attribute_generalization_list[qid_index], unique_value_to_split_at)
+
+        qi_len = mondrian_module.NUM_OF_QIDS_USED
+        return [SQLitePartition(l_count, l_attribute_width_list, l_attribute_generalization_list, qi_len),
+                SQLitePartition(len(partition) - l_count, r_attribute_width_list, r_attribute_generalization_list, qi_len)]
+
+    def split_categorical_attribute(self, partition: SQLitePartition, qid_index: int) -> list[SQLitePartition]:
+        """ Split the partition along the children of its hierarchy node, see mondrian.split_categorical_attribute """
+
+        node_to_split_at = mondrian_module.ATT_TREES[qid_index][partition.attribute_generalization_list[qid_index]]
+        child_nodes = node_to_split_at.children[:]
+        if len(child_nodes) == 0:
+            return []
+
+        sub_group_sizes = [0] * len(child_nodes)
+        for qid_value, count in self.get_frequency_set(partition, qid_index).items():
+            for i, node in enumerate(child_nodes):
+                if qid_value in node.cover:
+                    sub_group_sizes[i] += count
+                    break
+            else:
+                print("Generalization hierarchy error!")
+
+        for sub_group_size in sub_group_sizes:
+            # If one child covers less than k elements, the split is invalid
+            if 0 < sub_group_size < mondrian_module.GLOBAL_K:
+                return []
+
+        sub_partitions = []
+        for i, sub_group_size in enumerate(sub_group_sizes):
+            if sub_group_size == 0:
+                continue
+            new_attribute_width_list = partition.attribute_width_list[:]
+            new_attribute_generalization_list = partition.attribute_generalization_list[:]
+            new_attribute_width_list[qid_index] = len(child_nodes[i])
+            new_attribute_generalization_list[qid_index] = child_nodes[i].value
+            sub_partitions.append(SQLitePartition(sub_group_size, new_attribute_width_list, new_attribute_generalization_list,
+                                                  mondrian_module.NUM_OF_QIDS_USED))
+        return sub_partitions
+
+    def anonymize(self, whole_partition: SQLitePartition) -> list[SQLitePartition]:
+        """ Split the partitions depth-first, in the same order as mondrian.anonymize, and return the closed ones """
+
+        result = []
+        frontier = [whole_partition]
+        while frontier:
+            partition = frontier.pop()
+            while check_splitable(partition):
+                qid_index = choose_qid(partition)
+                if mondrian_module.IS_QID_CATEGORICAL[qid_index] is False:
+                    sub_partitions = self.split_numerical_attribute(partition, qid_index)
+                else:
+                    sub_partitions = self.split_categorical_attribute(partition, qid_index)
+                if len(sub_partitions) == 0:
+                    partition.attribute_split_allowed_list[qid_index] = 0
+                    continue
+                self.move_records(partition, qid_index, sub_partitions)
+                frontier.extend(reversed(sub_partitions))
+                break
+            else:
+                # The frequency sets are not needed any more, do not keep them alive in the result
+                partition.frequency_sets = {}
+                result.append(partition)
+        return result
+
+    def write_ec_ids(self, result: list[SQLitePartition]):
+        """ Renumber the partition ids of the rows to the index of their equivalence class """
+
+        for ec_id, partition in enumerate(result):
+            self.conn.execute('UPDATE %s SET %s = ? WHERE %s = ?' % (quote(self.table), self.pid_column, self.pid_column),
+                              [ec_id, partition.pid])
+        self.conn.commit()
+
+
+def mondrian_sqlite(att_trees: List[Dict[str, GenTree] | NumRange], conn: sqlite3.Connection, table: str,
+                    qi_columns: list[str], k: int, ec_column='ec_id'):
+    """
+    basic Mondrian for k-anonymity on a SQLite table.
+    Only the counts of the GROUP BY queries are read into Python, never the rows.
+    The records of each partition are tracked in the indexed ec_column: a split is an UPDATE of the partition ids,
+    and the frequency set of a partition is a GROUP BY over the rows with its id.
+    At the end, ec_column holds the index of the equivalence class of each row.
+    The NumRanges of the numeric QIDs must cover the values of the table.
+
+    Returns
+    -------
+    (list[tuple[list[str], int]], (float, float))
+        the generalized QID values and the number of records of each equivalence class, indexed by the value of ec_column
+        the NCP percentage and the running time, like mondrian
+    """
+
+    init(att_trees, [qi_columns], k, len(qi_columns))
+    attribute_width_list, attribute_generalization_list = init_qi_range()
+    start_time = time.time()
+    backend = SQLiteMondrian(conn, table, qi_columns, ec_column)
+    backend.create_pid_column()
+
+    (count,) = conn.execute('SELECT COUNT(*) FROM %s' % quote(table)).fetchone()
+    whole_partition = SQLitePartition(count, attribute_width_list, attribute_generalization_list, len(qi_columns))
+    result = backend.anonymize(whole_partition)
+    backend.write_ec_ids(result)
+    rtime = float(time.time() - start_time)
+
+    ncp = 0.0
+    for partition in result:
+        r_ncp = 0.0
+        for i in range(len(qi_columns)):
+            r_ncp += get_normalized_width(partition, i)
+        ncp += r_ncp * len(partition)
+    ncp /= len(qi_columns)
+    ncp /= count
+    ncp *= 100
+    return ([(partition.attribute_generalization_list, len(partition)) for partition in result], (ncp, rtime))
@@ -0,0 +1,30 @@
+import sqlite3
+import unittest
+
+import mondrian as mondrian_module
+from mondrian import mondrian
+from sqlite_backend import load_table, mondrian_sqlite
+from fixtures import read_adult_sample
+from utils.read_adult_data import ATT_NAMES, IS_CAT, QI_INDEX
+
+
+class sqliteBackendTest(unittest.TestCase):
+    def test_same_as_mondrian(self):
+        data, att_trees = read_adult_sample()
+        qi_columns = [ATT_NAMES[index] for index in QI_INDEX]
+        conn = sqlite3.connect(':memory:')
+        load_table(conn, 'adult', data, qi_columns, 'class', IS_CAT)
+
+        for k in [5, 20]:
+            _, (ncp, _) = mondrian(att_trees, data, k)
+            expected = [(partition.attribute_generalization_list, len(partition)) for partition in mondrian_module.RESULT]
+            result, (sqlite_ncp, _) = mondrian_sqlite(att_trees, conn, 'adult', qi_columns, k)
+            self.assertEqual(result, expected)
+            self.assertAlmostEqual(ncp, sqlite_ncp)
+
+            sizes = dict(conn.execute('SELECT ec_id, COUNT(*) FROM adult GROUP BY ec_id'))
+            self.assertEqual(sizes, {ec_id: count for ec_id, (_, count) in enumerate(result)})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+"""
+checkpoints of the pending and closed partitions of a Mondrian run
+"""
+# !/usr/bin/env python
+# coding=utf-8
+import os
+import pickle
+import zlib
+
+from array import array
+
+from models.partition import Partition
+
+CHECKPOINT_VERSION = 1
+
+
+def encode_partition(partition: Partition, record_index: dict[int, int]) -> tuple:
+    """ Encode a partition compactly: its members are stored as the indices of the records in the dataset """
+
+    members = array('I', [record_index[id(record)] for record in partition.members])
+    return (members.tobytes(), partition.attribute_width_list, partition.attribute_generalization_list,
+            partition.attribute_split_allowed_list, partition.node)
+
+
+def decode_partition(encoded: tuple, data: list[list[str]]) -> Partition:
+    """ Rebuild a partition encoded by encode_partition, from the same dataset """
+
+    members_bytes, attribute_width_list, attribute_generalization_list, attribute_split_allowed_list, node = encoded
+    members = array('I')
+    members.frombytes(members_bytes)
+    partition = Partition([data[i] for i in members], attribute_width_list, attribute_generalization_list, len(attribute_split_allowed_list))
+    partition.attribute_split_allowed_list = list(attribute_split_allowed_list)
+    partition.node = node
+    return partition
+
+
+def get_data_fingerprint(data: list[list[str]], k: int, qi_num: int) -> int:
+    """ Return a checksum of the run settings and of the dataset, to refuse resuming with a different one """
+
+    return zlib.crc32(repr((len(data), k, qi_num, data[:100], data[-100:])).encode())
+
+
+def save_checkpoint(path: str, fingerprint: int, frontier: list[tuple[Partition, int]], result: list[Partition],
+                    root, record_index: dict[int, int]):
+    """
+    Write the state of a run to path atomically: the file is written next to path and then renamed over it,
+    so a run killed while writing leaves the previous checkpoint intact.
+
+        Parameters
+        ----------
+        frontier : list
+            The pending (partition, depth) pairs
+        result : list
+            The closed partitions
+        root : SplitNode
+            The root of the partition tree, the nodes of the partitions are pickled together with it
+    """
+
+    state = {'version': CHECKPOINT_VERSION,
+             'fingerprint': fingerprint,
+             'frontier': [(encode_partition(partition, record_index), depth) for partition, depth in frontier],
+             'result': [encode_partition(partition, record_index) for partition in result],
+             'root': root}
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as checkpoint_file:
+        checkpoint_file.write(zlib.compress(pickle.dumps(state, pickle.HIGHEST_PROTOCOL)))
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+    os.replace(temp_path, path)
+
+
+def load_checkpoint(path: str, fingerprint: int, data: list[list[str]]):
+    """
+    Read a checkpoint written by save_checkpoint.
+
+    Returns
+    -------
+    (list[tuple[Partition, int]], list[Partition], SplitNode)
+        the pending (partition, depth) pairs, the closed partitions and the root of the partition tree
+    """
+
+    with open(path, 'rb') as checkpoint_file:
+        state = pickle.loads(zlib.decompress(checkpoint_file.read()))
+    if state['version'] != CHECKPOINT_VERSION or state['fingerprint'] != fingerprint:
+        raise ValueError("The checkpoint %s belongs to a different dataset or setting" % path)
+
+    frontier = [(decode_partition(encoded, data), depth) for encoded, depth in state['frontier']]
+    result = [decode_partition(encoded, data) for encoded in state['result']]
+    return frontier, result, state['root']
@@ -0,0 +1,20 @@
+"""
+collapse records with identical QID values into weighted groups
+"""
+# !/usr/bin/env python
+# coding=utf-8
+
+from models.weighted_record import WeightedRecord
+
+
+def collapse_duplicates(data: list[list[str]], qi_num: int) -> list[WeightedRecord]:
+    """ Group the records by their first qi_num values, the groups are in the order of their first record """
+
+    groups: dict[tuple, WeightedRecord] = {}
+    for record in data:
+        key = tuple(record[:qi_num])
+        try:
+            groups[key].add(record[-1])
+        except KeyError:
+            groups[key] = WeightedRecord(key, record[-1])
+    return list(groups.values())
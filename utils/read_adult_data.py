@@ -21,8 +21,13 @@
 #   ['occopation']
 
 from models.gentree import GenTree
+from models.lazy_trees import LazyTrees
 from models.numrange import NumRange
 
+from functools import partial
+from multiprocessing import Pool
+
+import os
 import pickle
 import pdb
 
@@ -40,12 +45,56 @@ SA_INDEX = -1
 __DEBUG = False
 
 
-# Filter out the QIDs and the SA from the original data file
-def read_data() -> list[list[str]]:
-    """ Read microda for *.txt and return read data """
-    
+def get_qi_selection(qi_names: list[str] | None = None) -> tuple[list[int], list[bool]]:
+    """ Return the column indices and the categorical flags of the QIDs with the given names, in that order, all the QIDs by default """
+
+    if qi_names is None:
+        return QI_INDEX, IS_CAT
+    if len(qi_names) == 0:
+        raise ValueError("At least one QID is needed")
+    qi_columns = [ATT_NAMES[index] for index in QI_INDEX]
+    qi_index = []
+    is_cat = []
+    for name in qi_names:
+        if name not in qi_columns:
+            raise ValueError("%s is not a QID, the QIDs are %s" % (name, ', '.join(qi_columns)))
+        qi_index.append(QI_INDEX[qi_columns.index(name)])
+        is_cat.append(IS_CAT[qi_columns.index(name)])
+    return qi_index, is_cat
+
+
+def encode_chunk(data_path: str, start: int, end: int, qi_names: list[str] | None = None) -> tuple[list[str], list[dict[str, int]]]:
+    """ Read a chunk of the file (see read_chunk) and encode its records column by column, one string per column.
+    A few long strings are much cheaper to send back from a worker process than many small lists.
+    """
+
+    data, numeric_dict = read_chunk(data_path, start, end, qi_names)
+    if len(data) == 0:
+        return [], numeric_dict
+    return ['\n'.join(column) for column in zip(*data)], numeric_dict
+
+
+def decode_chunk(columns: list[str]) -> list[list[str]]:
+    """ Rebuild the records of a chunk encoded by encode_chunk """
+
+    return [list(record) for record in zip(*[column.split('\n') for column in columns])]
+
+
+def read_chunk(data_path: str, start: int, end: int, qi_names: list[str] | None = None) -> tuple[list[list[str]], list[dict[str, int]]]:
+    """ Read the lines of the file that start in the byte range [start, end), keeping the QIDs in qi_names (all by default)
+
+    Returns
+    -------
+    (list[list[str]], list[dict[str, int]])
+        the records of the lines, with the QID and SA values only
+        for each QID, how many times each unique value shows up (filled for numeric QIDs only)
+    """
+
+    qi_index, is_cat = get_qi_selection(qi_names)
     # The number of QIDs
-    QI_num = len(QI_INDEX)
+    QI_num = len(qi_index)
+    # The columns after the last QID are not split, the SA is taken after the last comma
+    last_index = max(qi_index)
     # Data with the QID and SA values only
     data = []
     numeric_dict = []
@@ -54,30 +103,37 @@ def read_data() -> list[list[str]]:
     for i in range(QI_num):
         numeric_dict.append(dict())
 
-    # other categorical attributes in intuitive order
-    # here, we use the appear number
-    data_file = open('data/adult.data', newline=None)
+    data_file = open(data_path, 'rb')
+    # The line that contains the byte before start belongs to the previous chunk
+    if start > 0:
+        data_file.seek(start - 1)
+        data_file.readline()
+    position = data_file.tell()
 
     # Extract the QID attributes and the sensitive attribute into the data variable
-    for line in data_file:
+    while position < end:
+        raw_line = data_file.readline()
+        if len(raw_line) == 0:
+            break
+        position += len(raw_line)
         # Remove spaces at the beginning and at the end of the string
-        line = line.strip()
+        line = raw_line.decode().strip()
         # Remove empty and incomplete lines >> only 30162 records will be kept
         if len(line) == 0 or '?' in line:
             continue
         # Remove spaces from between attribute values
         line = line.replace(' ', '')
         # Split the line along commas, creating an array that stores the attribute values from the current line
-        temp = line.split(',')
+        temp = line.split(',', last_index + 1)
 
         ltemp = []
 
         for i in range(QI_num):
             # Get the index of the current attribute in the original data (nth column it is located in)
-            index = QI_INDEX[i]
+            index = qi_index[i]
 
             # Store how many times each unique value of numerical attributes show up
-            if IS_CAT[i] is False:
+            if is_cat[i] is False:
                 try:
                     numeric_dict[i][temp[index]] += 1
                 except KeyError:
@@ -86,14 +142,63 @@ def read_data() -> list[list[str]]:
             ltemp.append(temp[index])
 
         # Add the sensitive attribute value to the ltemp array
-        ltemp.append(temp[SA_INDEX])
+        ltemp.append(line[line.rfind(',') + 1:])
         data.append(ltemp)
+    data_file.close()
+
+    return data, numeric_dict
+
+
+# Filter out the QIDs and the SA from the original data file
+def read_data(data_path='data/adult.data', write_static=True, processes=1, qi_names: list[str] | None = None,
+              static_dir='data') -> list[list[str]]:
+    """ Read microda for *.txt and return read data
+
+        Parameters
+        ----------
+        data_path : str
+            The file to read, in the format of adult.data
+        write_static : bool
+            Whether to write the pickle files of the numeric attributes read by read_tree, into static_dir
+        processes : int
+            If more than 1, the file is split into byte ranges aligned to the lines, which are parsed by that many processes.
+            The workers send back their records encoded by column and partial counts of the numeric values, which are merged here.
+            The records keep the order of the file.
+        qi_names : list[str]
+            The QIDs to keep in the records, in that order, all of them by default. The other columns are not parsed.
+    """
+
+    file_size = os.path.getsize(data_path)
+    if processes <= 1:
+        data, numeric_dict = read_chunk(data_path, 0, file_size, qi_names)
+    else:
+        # More chunks than processes, so a slow chunk does not hold back the others
+        chunk_num = processes * 4
+        bounds = [file_size * i // chunk_num for i in range(chunk_num + 1)]
+        with Pool(processes) as pool:
+            chunks = pool.starmap(encode_chunk, [(data_path, bounds[i], bounds[i + 1], qi_names) for i in range(chunk_num)])
+
+        # Merge the records and the counts of the numeric values of the chunks
+        data = decode_chunk(chunks[0][0])
+        numeric_dict = chunks[0][1]
+        for chunk_columns, chunk_numeric_dict in chunks[1:]:
+            data.extend(decode_chunk(chunk_columns))
+            for i, counts in enumerate(chunk_numeric_dict):
+                for value, count in counts.items():
+                    try:
+                        numeric_dict[i][value] += count
+                    except KeyError:
+                        numeric_dict[i][value] = count
+
+    if write_static is False:
+        return data
 
     # Write the information gathered about the various numeric attributes values into a new file, through the serialization library named pickle
     # Parsing happens through read_pickle_file
-    for i in range(QI_num):
-        if IS_CAT[i] is False:
-            static_file = open('data/adult_' + ATT_NAMES[QI_INDEX[i]] + '_static.pickle', 'wb')
+    qi_index, is_cat = get_qi_selection(qi_names)
+    for i in range(len(qi_index)):
+        if is_cat[i] is False:
+            static_file = open(os.path.join(static_dir, 'adult_' + ATT_NAMES[qi_index[i]] + '_static.pickle'), 'wb')
             sort_value = list(numeric_dict[i].keys())
             sort_value.sort(key=lambda x: int(x))
             pickle.dump((numeric_dict[i], sort_value), static_file)
@@ -102,33 +207,52 @@ def read_data() -> list[list[str]]:
     return data
 
 
-def read_tree():
+def read_tree(max_bins=None, binning='quantile', qi_names: list[str] | None = None, static_dir='data') -> LazyTrees:
     """read tree from data/tree_*.txt, store them in att_tree
+    The hierarchies of the QIDs in qi_names (all by default) are read the first time they are used, see LazyTrees
+    The NumRanges are read from the pickle files read_data wrote into static_dir
     """
+    qi_index, is_cat = get_qi_selection(qi_names)
     att_names = []
-    att_trees = []
-    for t in QI_INDEX:
+    loaders = []
+    for t in qi_index:
         att_names.append(ATT_NAMES[t])
     for i in range(len(att_names)):
-        if IS_CAT[i]:
-            att_trees.append(read_tree_file(att_names[i]))
+        if is_cat[i]:
+            loaders.append(partial(read_tree_file, att_names[i]))
         else:
-            att_trees.append(read_pickle_file(att_names[i]))
-    return att_trees
+            loaders.append(partial(read_pickle_file, att_names[i], max_bins, binning, static_dir))
+    return LazyTrees(loaders)
+
+
+def get_num_range(data: list[list[str]], qi_index: int, max_bins=None, binning='quantile') -> NumRange:
+    """ Build the NumRange of a numeric QID from the records, instead of reading it from its pickle file """
+
+    numeric_dict = {}
+    for record in data:
+        try:
+            numeric_dict[record[qi_index]] += 1
+        except KeyError:
+            numeric_dict[record[qi_index]] = 1
+    sort_value = list(numeric_dict.keys())
+    sort_value.sort(key=lambda x: int(x))
+    return NumRange(sort_value, numeric_dict, max_bins, binning)
 
 
-def read_pickle_file(att_name):
+def read_pickle_file(att_name, max_bins=None, binning='quantile', static_dir='data'):
     """
     read pickle file for numeric attributes
-    return numrange object
+    return numrange object, with at most max_bins base bins if given (see NumRange.build_bins)
+    The pickle file is written by read_data, a FileNotFoundError is raised if it does not exist yet
     """
+    static_path = os.path.join(static_dir, 'adult_' + att_name + '_static.pickle')
     try:
-        static_file = open('data/adult_' + att_name + '_static.pickle', 'rb')
+        static_file = open(static_path, 'rb')
+    except FileNotFoundError:
+        raise FileNotFoundError("%s does not exist, run read_data(static_dir=%r) first to write it" % (static_path, static_dir))
+    with static_file:
         (numeric_dict, sort_value) = pickle.load(static_file)
-    except:
-        print("Pickle file not exists!!")
-    static_file.close()
-    result = NumRange(sort_value, numeric_dict)
+    result = NumRange(sort_value, numeric_dict, max_bins, binning)
     return result
 
 
@@ -5,11 +5,14 @@
 # user att ['DUID', 'PID', 'DUPERSID', 'DOBMM', 'DOBYY', 'SEX', 'RACEX', 'RACEAX', 'RACEBX', 'RACEWX', 'RACETHNX', 'HISPANX', 'HISPCAT', 'EDUCYEAR', 'Year', 'marry', 'income', 'poverty']
 # condition att ['DUID', 'DUPERSID', 'ICD9CODX', 'year']
 from models.gentree import GenTree
+from models.lazy_trees import LazyTrees
 from models.numrange import NumRange
 from utils.utility import cmp_str
 import pickle
 import pdb
 
+from functools import partial
+
 
 __DEBUG = False
 USER_ATT = ['DUID', 'PID', 'DUPERSID', 'DOBMM', 'DOBYY', 'SEX',
@@ -22,35 +25,40 @@ QI_INDEX = [3, 4, 6, 13, 16]
 IS_CAT = [True, True, True, True, False]
 
 
-def read_tree():
+def read_tree(max_bins=None, binning='quantile', qi_names: list[str] | None = None) -> LazyTrees:
     """
     read tree from data/tree_*.txt, store them in att_tree
+    The hierarchies of the QIDs in qi_names (all by default) are read the first time they are used, see LazyTrees
     """
-    att_names = []
-    att_trees = []
-    for t in QI_INDEX:
-        att_names.append(USER_ATT[t])
-    for i in range(len(att_names)):
-        if IS_CAT[i]:
-            att_trees.append(read_tree_file(att_names[i]))
+    qi_columns = [USER_ATT[t] for t in QI_INDEX]
+    if qi_names is None:
+        qi_names = qi_columns
+    loaders = []
+    for name in qi_names:
+        if name not in qi_columns:
+            raise ValueError("%s is not a QID, the QIDs are %s" % (name, ', '.join(qi_columns)))
+        if IS_CAT[qi_columns.index(name)]:
+            loaders.append(partial(read_tree_file, name))
         else:
-            att_trees.append(read_pickle_file(att_names[i]))
-    return att_trees
+            loaders.append(partial(read_pickle_file, name, max_bins, binning))
+    return LazyTrees(loaders)
 
 
-def read_pickle_file(att_name):
+def read_pickle_file(att_name, max_bins=None, binning='quantile'):
     """
     read pickle file for numeric attributes
-    return numrange object
+    return numrange object, with at most max_bins base bins if given (see NumRange.build_bins)
+    The pickle file is written by read_data, a FileNotFoundError is raised if it does not exist yet
     """
+    static_path = 'data/informs_' + att_name + '_static.pickle'
     try:
-        static_file = open('data/informs_' + att_name + '_static.pickle', 'rb')
+        static_file = open(static_path, 'rb')
+    except FileNotFoundError:
+        raise FileNotFoundError("%s does not exist, run read_data() first to write it" % static_path)
+    with static_file:
         (numeric_dict, sort_value) = pickle.load(static_file)
-        static_file.close()
-        result = NumRange(sort_value, numeric_dict)
-        return result
-    except:
-        print( "Pickle file not exists!!", att_name)
+    result = NumRange(sort_value, numeric_dict, max_bins, binning)
+    return result
 
 
 def read_tree_file(treename):
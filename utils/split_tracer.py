@@ -0,0 +1,48 @@
+"""
+tracer of the recursion of Mondrian, exported in the Chrome trace-event format
+"""
+# !/usr/bin/env python
+# coding=utf-8
+import json
+import os
+import time
+
+
+class SplitTracer(object):
+
+    """Collect one span per partition visit of anonymize, and one span per call of the split routines.
+    The spans of the visits are nested like the recursion, so the span of a partition covers its whole subtree.
+    self.events: the recorded complete ("ph": "X") trace events
+    """
+
+    def __init__(self):
+        self.events: list[dict] = []
+        self.start_time = time.perf_counter()
+
+    def now(self) -> float:
+        """ Return the current time, to be passed to complete when the span ends """
+
+        return time.perf_counter()
+
+    def complete(self, name: str, start: float, args: dict | None = None):
+        """ Record the span that started at start (see now) and ends now """
+
+        end = time.perf_counter()
+        self.events.append({'name': name, 'cat': 'mondrian', 'ph': 'X', 'pid': os.getpid(), 'tid': 0,
+                            # Timestamps and durations are in microseconds
+                            'ts': round((start - self.start_time) * 1e6, 3),
+                            'dur': round((end - start) * 1e6, 3),
+                            'args': args or {}})
+
+    def to_dict(self) -> dict:
+        """ Return the trace in the JSON object format of the trace-event specification """
+
+        # Sort by start time and put the parents before their children, as some viewers expect
+        events = sorted(self.events, key=lambda event: (event['ts'], -event['dur']))
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export(self, path: str):
+        """ Write the trace to a JSON file, which can be opened in chrome://tracing or ui.perfetto.dev """
+
+        with open(path, "w") as output:
+            json.dump(self.to_dict(), output)
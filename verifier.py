@@ -0,0 +1,243 @@
+"""
+verify that an anonymized file is k-anonymous (and l-diverse), reading it as a stream with bounded memory
+"""
+
+# !/usr/bin/env python
+# coding=utf-8
+import os
+import pickle
+import sys
+import tempfile
+import zlib
+
+from typing import Dict, Iterator, List
+
+from models.gentree import GenTree
+from models.numrange import NumRange
+
+# The number of bucket files the classes are spilled to, when too many of them are in memory
+SPILL_BUCKETS = 64
+# The number of examples of each violation kept in the report
+MAX_EXAMPLES = 10
+
+
+def read_rows(path: str, qi_num: int) -> Iterator[tuple[tuple[str, ...], int, list[str]]]:
+    """
+    Read an anonymized file in the row format of anonymizer.write_to_file: qid_1;...;qid_n;sa, one line per record.
+    Yield (QID tuple, number of records, SA values) for every line.
+    """
+
+    with open(path) as anonymized_file:
+        for line in anonymized_file:
+            fields = line.rstrip('\n').split(';')
+            if len(fields) <= 1:
+                continue
+            yield tuple(fields[:qi_num]), 1, [';'.join(fields[qi_num:])]
+
+
+def read_classes(path: str, qi_num: int) -> Iterator[tuple[tuple[str, ...], int, list[str]]]:
+    """
+    Read an anonymized file in the equivalence class format of write_classes: qid_1;...;qid_n;count[;sa_1;...;sa_count],
+    one line per class. The SA values are optional, they are only needed to check l-diversity.
+    Yield (QID tuple, number of records, SA values) for every line.
+    """
+
+    with open(path) as anonymized_file:
+        for line in anonymized_file:
+            fields = line.rstrip('\n').split(';')
+            if len(fields) <= 1:
+                continue
+            yield tuple(fields[:qi_num]), int(fields[qi_num]), fields[qi_num + 1:]
+
+
+def write_classes(result: list[list[str]], path: str, qi_num: int):
+    """ Write the result of mondrian in the equivalence class format (see read_classes), the records of a class need not be adjacent """
+
+    classes: Dict[tuple[str, ...], list[str]] = {}
+    for record in result:
+        key = tuple(record[:qi_num])
+        try:
+            classes[key].append(record[-1])
+        except KeyError:
+            classes[key] = [record[-1]]
+    with open(path, 'w') as output:
+        for key, sensitive_values in classes.items():
+            output.write(';'.join(list(key) + [str(len(sensitive_values))] + sensitive_values) + '\n')
+
+
+def check_generalization(att_tree: Dict[str, GenTree] | NumRange, value: str) -> bool:
+    """ Check that a generalized value is a node of the hierarchy (categorical), or a value or range of the domain (numeric) """
+
+    if not isinstance(att_tree, NumRange):
+        return value in att_tree
+    bounds = value.split(',')
+    if len(bounds) > 2:
+        return False
+    try:
+        low = float(bounds[0])
+        high = float(bounds[-1])
+    except ValueError:
+        return False
+    return float(att_tree.sort_value[0]) <= low <= high <= float(att_tree.sort_value[-1])
+
+
+def get_bucket(key: tuple[str, ...], level: int) -> int:
+    """ Hash a QID tuple into a bucket, the level salts the hash so that a bucket can be split again """
+
+    return zlib.crc32(('%d;' % level + ';'.join(key)).encode()) % SPILL_BUCKETS
+
+
+def spill(classes: dict, bucket_files: list, level: int):
+    """ Append the partial classes to their bucket files """
+
+    for key, (count, sensitive_counts) in classes.items():
+        pickle.dump((key, count, sensitive_counts), bucket_files[get_bucket(key, level)], pickle.HIGHEST_PROTOCOL)
+
+
+def read_spilled(path: str) -> Iterator[tuple[tuple[str, ...], int, Dict[str, int] | None]]:
+    """ Read the partial classes of a bucket file """
+
+    with open(path, 'rb') as bucket_file:
+        while True:
+            try:
+                yield pickle.load(bucket_file)
+            except EOFError:
+                return
+
+
+def group_classes(entries, count_sensitive: bool, max_classes: int, tmp_dir: str, level=0) -> Iterator[tuple]:
+    """
+    Group the entries (QID tuple, count, SA values or SA counts) by QID tuple and yield (QID tuple, count, SA counts).
+    At most max_classes classes are kept in memory: beyond that, the partial classes are spilled to bucket files
+    by hash of their QID tuple, and each bucket is grouped on its own afterwards (spilling again if needed).
+    """
+
+    classes: Dict[tuple[str, ...], list] = {}
+    bucket_files = None
+    bucket_paths = []
+    for key, count, sensitive_values in entries:
+        try:
+            entry = classes[key]
+        except KeyError:
+            if len(classes) >= max_classes:
+                if bucket_files is None:
+                    bucket_paths = [os.path.join(tmp_dir, 'bucket_%d_%d' % (level, i)) for i in range(SPILL_BUCKETS)]
+                    bucket_files = [open(bucket_path, 'wb') for bucket_path in bucket_paths]
+                spill(classes, bucket_files, level)
+                classes = {}
+            entry = classes[key] = [0, {} if count_sensitive else None]
+        entry[0] += count
+        if count_sensitive:
+            sensitive_counts = entry[1]
+            # The SA values of the input, or the SA counts of a spilled partial class
+            items = sensitive_values.items() if isinstance(sensitive_values, dict) else ((value, 1) for value in sensitive_values)
+            for value, value_count in items:
+                sensitive_counts[value] = sensitive_counts.get(value, 0) + value_count
+
+    if bucket_files is None:
+        for key, (count, sensitive_counts) in classes.items():
+            yield key, count, sensitive_counts
+        return
+
+    spill(classes, bucket_files, level)
+    classes = {}
+    for bucket_file in bucket_files:
+        bucket_file.close()
+    for bucket_path in bucket_paths:
+        yield from group_classes(read_spilled(bucket_path), count_sensitive, max_classes, tmp_dir, level + 1)
+        os.remove(bucket_path)
+
+
+def verify(path: str, qi_num: int, k: int, l: int | None = None, att_trees: List[Dict[str, GenTree] | NumRange] | None = None,
+           file_format='rows', max_classes=1000000, tmp_dir: str | None = None) -> dict:
+    """
+    Verify an anonymized file, which can be larger than the memory: the rows are grouped by generalized QID tuple,
+    with at most max_classes classes in memory, the others are spilled to disk (see group_classes).
+
+        Parameters
+        ----------
+        qi_num : int
+            The number of QIDs in each line
+        l : int
+            If given, every class must also hold at least l distinct SA values
+        att_trees : list
+            If given, every generalized value is checked against the hierarchies (see check_generalization)
+        file_format : str
+            'rows' (see read_rows) or 'classes' (see read_classes)
+        tmp_dir : str
+            Where to spill, a temporary directory by default
+
+    Returns
+    -------
+    dict
+        records: the number of records
+        classes: the number of equivalence classes (distinct QID tuples)
+        k_violations, l_violations, invalid_generalizations: the number of classes that break each check,
+            with up to MAX_EXAMPLES of them under k_examples, l_examples and invalid_examples
+        violating_records: the number of records in classes smaller than k
+        class_sizes: the number of classes of each size, {size: classes}
+        valid: True if all checks passed
+    """
+
+    if file_format == 'rows':
+        entries = read_rows(path, qi_num)
+    elif file_format == 'classes':
+        entries = read_classes(path, qi_num)
+    else:
+        raise ValueError("Unknown file format %s, use 'rows' or 'classes'" % file_format)
+
+    report = {'records': 0, 'classes': 0, 'k_violations': 0, 'l_violations': 0, 'invalid_generalizations': 0,
+              'violating_records': 0, 'k_examples': [], 'l_examples': [], 'invalid_examples': [], 'class_sizes': {}}
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as spill_dir:
+        for key, count, sensitive_counts in group_classes(entries, l is not None, max_classes, spill_dir):
+            report['records'] += count
+            report['classes'] += 1
+            report['class_sizes'][count] = report['class_sizes'].get(count, 0) + 1
+            if count < k:
+                report['k_violations'] += 1
+                report['violating_records'] += count
+                if len(report['k_examples']) < MAX_EXAMPLES:
+                    report['k_examples'].append((key, count))
+            if l is not None and len(sensitive_counts) < l:
+                report['l_violations'] += 1
+                if len(report['l_examples']) < MAX_EXAMPLES:
+                    report['l_examples'].append((key, len(sensitive_counts)))
+            if att_trees is not None:
+                invalid = [i for i in range(qi_num) if not check_generalization(att_trees[i], key[i])]
+                if len(invalid) > 0:
+                    report['invalid_generalizations'] += 1
+                    if len(report['invalid_examples']) < MAX_EXAMPLES:
+                        report['invalid_examples'].append((key, invalid))
+    report['class_sizes'] = dict(sorted(report['class_sizes'].items()))
+    report['valid'] = report['k_violations'] == 0 and report['l_violations'] == 0 and report['invalid_generalizations'] == 0
+    return report
+
+
+if __name__ == '__main__':
+    from utils.read_adult_data import read_tree as read_adult_tree
+    from utils.read_informs_data import read_tree as read_informs_tree
+
+    ARGS = [arg for arg in sys.argv[1:] if arg != '--classes']
+    FILE_FORMAT = 'classes' if '--classes' in sys.argv else 'rows'
+    if len(ARGS) < 2:
+        print("Usage: python verifier.py [a | i] k [l] [anonymized_file] [--classes]")
+        print("a: adult dataset, 'i': INFORMS dataset, the file defaults to data/anonymized.data")
+        print("--classes: the file holds one line per equivalence class: qid_1;...;qid_n;count[;sa_1;...]")
+        sys.exit(1)
+    ATT_TREES = read_informs_tree() if ARGS[0] == 'i' else read_adult_tree()
+    K = int(ARGS[1])
+    L = int(ARGS[2]) if len(ARGS) > 2 and ARGS[2].isdigit() else None
+    PATH = ARGS[-1] if len(ARGS) > 2 and not ARGS[-1].isdigit() else 'data/anonymized.data'
+    REPORT = verify(PATH, len(ATT_TREES), K, L, ATT_TREES, FILE_FORMAT)
+    print("%d records in %d classes" % (REPORT['records'], REPORT['classes']))
+    print("Class sizes: %s" % ', '.join('%d: %d' % item for item in REPORT['class_sizes'].items()))
+    print("%d classes (%d records) smaller than k=%d" % (REPORT['k_violations'], REPORT['violating_records'], K))
+    for KEY, COUNT in REPORT['k_examples']:
+        print("    %d records: %s" % (COUNT, ';'.join(KEY)))
+    if L is not None:
+        print("%d classes with less than l=%d distinct sensitive values" % (REPORT['l_violations'], L))
+    print("%d classes with generalizations outside the hierarchies" % REPORT['invalid_generalizations'])
+    for KEY, INVALID in REPORT['invalid_examples']:
+        print("    QIDs %s: %s" % (INVALID, ';'.join(KEY)))
+    print("Valid" if REPORT['valid'] else "NOT valid")
+    sys.exit(0 if REPORT['valid'] else 2)
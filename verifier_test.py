@@ -0,0 +1,56 @@
+import collections
+import os
+import tempfile
+import unittest
+
+from anonymizer import write_to_file
+from fixtures import read_adult_sample
+from mondrian import mondrian
+from verifier import verify, write_classes
+
+
+class verifierTest(unittest.TestCase):
+    def setUp(self):
+        self.data, self.att_trees = read_adult_sample()
+
+    def test_mondrian_output(self):
+        result, _ = mondrian(self.att_trees, self.data, 10)
+        sizes = collections.Counter(collections.Counter(tuple(record[:8]) for record in result).values())
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            rows_path = os.path.join(tmp_dir, 'anonymized.data')
+            classes_path = os.path.join(tmp_dir, 'anonymized.classes')
+            write_to_file(result, rows_path)
+            write_classes(result, classes_path, 8)
+            report = verify(rows_path, 8, 10, 2, self.att_trees)
+            # Spill to disk with only 7 classes in memory
+            spilled_report = verify(rows_path, 8, 10, 2, self.att_trees, max_classes=7, tmp_dir=tmp_dir)
+            classes_report = verify(classes_path, 8, 10, 2, self.att_trees, file_format='classes')
+        self.assertEqual(report['records'], 3000)
+        self.assertEqual(report['class_sizes'], dict(sorted(sizes.items())))
+        self.assertEqual(report['k_violations'], sum(count for size, count in sizes.items() if size < 10))
+        self.assertEqual(report['invalid_generalizations'], 0)
+        for key in ['records', 'classes', 'k_violations', 'l_violations', 'violating_records', 'class_sizes', 'valid']:
+            self.assertEqual(spilled_report[key], report[key])
+            self.assertEqual(classes_report[key], report[key])
+
+    def test_violations(self):
+        lines = ['17,30;Private;9;*;*;White;Male;*;<=50K'] * 3 + \
+                ['31,40;Martian;9;*;*;White;Male;*;<=50K', '31,40;Martian;9;*;*;White;Male;*;>50K',
+                 '31,40;Martian;9;*;*;White;Male;*;>50K', '40,95;*;9;*;*;White;Male;*;>50K']
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'anonymized.data')
+            with open(path, 'w') as output:
+                output.write('\n'.join(lines) + '\n')
+            report = verify(path, 8, 3, 2, self.att_trees)
+        self.assertFalse(report['valid'])
+        self.assertEqual(report['classes'], 3)
+        self.assertEqual(report['k_violations'], 1)
+        self.assertEqual(report['violating_records'], 1)
+        # The first class has a single SA value, the last one a single record
+        self.assertEqual(report['l_violations'], 2)
+        # Martian is not in the hierarchy of workclass, and 95 is above the largest age
+        self.assertEqual(sorted(invalid for _, invalid in report['invalid_examples']), [[0], [1]])
+
+
+if __name__ == '__main__':
+    unittest.main()